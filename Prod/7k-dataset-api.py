@@ -1,41 +1,67 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import pandas as pd
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import hmac
+import os
 import re
 import time
-import concurrent.futures
+from contextlib import nullcontext
+from functools import partial
+from startup_timing import PhaseTimer
+
+# Per-phase startup timing, reported by /api/startup
+startup = PhaseTimer(budget_ms=float(os.environ.get('STARTUP_BUDGET_MS', 8000)))
+
+with startup.phase('import numpy/pandas/sklearn'):
+    import pandas as pd
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+with startup.phase('import index modules'):
+    from scoring import PreferenceScorer, parse_page, top_k
+    from facet_index import FacetIndex
+    from inverted_index import InvertedIndex
+    from recipe_store import RecipeStore
+    from recipe_details import RecipeDetailStore
+    from index_artifact import build_hashed_index, build_index, current_version, index_path, load_index, \
+        load_recipes_csv, read_manifest, update_index
+    from hashing_index import HashingTfidf, text_chunks
+    from text_index import SubstringIndex
+    from result_cache import ResultCache, canonical_ingredients, canonical_cuisine, canonical_course, dataset_version
+    from snapshot import SnapshotManager
 
 app = Flask(__name__)
-CORS(app)
-
-# Load your dataset
-recipes_data = pd.read_csv('7k-dataset.csv')
-
-# Clean column names
-recipes_data.columns = recipes_data.columns.str.strip()
+# Browsers on other origins may call the public API, but not the admin routes
+CORS(app, resources={r"/api/(?!admin/).*": {}})
 
 # Define weights for user preferences
 cuisine_weight = 0.2
 course_weight = 0.3
 
-# Prepare TF-IDF vectorizer
-vectorizer = TfidfVectorizer(binary=True)
+# Load your dataset
+dataset_path = '7k-dataset.csv'
+index_dir = os.environ.get('RECIPE_INDEX_DIR', 'index')
+
+# Seconds between checks of the dataset (or the index CURRENT pointer) for a new version; 0 disables the watch
+reload_interval = float(os.environ.get('RELOAD_INTERVAL', 0))
 
-# Check if 'ingredients' column exists, if not, use 'ingredients_name'
-ingredients_column = 'ingredients' if 'ingredients' in recipes_data.columns else 'ingredients_name'
+# Vectorize in a hashed feature space with a stored idf table instead of a fitted vocabulary
+# (applies when fitting from the CSV and to index rebuilds; a built index keeps the mode it was built with)
+hashing_vectorizer = os.environ.get('HASHING_VECTORIZER', '0') == '1'
 
-if ingredients_column not in recipes_data.columns:
-    raise ValueError(f"Neither 'ingredients' nor 'ingredients_name' column found in the dataset. Available columns are: {recipes_data.columns.tolist()}")
+# The /api/admin routes require this value in the X-Admin-Token header; unset, they answer 403
+admin_token = os.environ.get('ADMIN_TOKEN')
 
-# Extract and join ingredients into text
-recipes_data["ingredients_list"] = recipes_data[ingredients_column].apply(lambda x: str(x).strip().split(","))
-recipes_data["ingredients_text"] = recipes_data["ingredients_list"].apply(lambda x: " ".join(x))
+# Similarity engines selectable per request; 'cosine' scores every row, 'inverted' only walks query terms
+# and 'maxscore' also skips recipes whose upper bound cannot reach the requested page
+recommend_engines = ('cosine', 'inverted', 'maxscore')
+default_engine = os.environ.get('RECOMMEND_ENGINE', 'cosine')
 
-# Fit vectorizer and transform recipe ingredients
-recipe_vectors = vectorizer.fit_transform(recipes_data["ingredients_text"])
+# Upper bound on queries per batch request; the score matrix is queries x recipes
+max_batch_size = 256
+
+# Recent results keyed by canonical request; entries are dropped when the dataset version changes
+result_cache = ResultCache(maxsize=int(os.environ.get('RESULT_CACHE_SIZE', 1024)),
+                           ttl=float(os.environ.get('RESULT_CACHE_TTL', 300)))
 
 # Update the calculate_weighted_similarity function
 def calculate_weighted_similarity(similarity, recipe, user_cuisine, user_course):
@@ -51,82 +77,147 @@ def calculate_weighted_similarity(similarity, recipe, user_cuisine, user_course)
     weighted_similarity = similarity * (1 - (cuisine_weight + course_weight)) + user_pref_similarity
     return weighted_similarity
 
-def calculate_difficulty(prep_time, cooking_time):
-    try:
-        total_time = float(prep_time) + float(cooking_time)
-        if total_time < 30:
-            return 'Easy'
-        elif total_time < 60:
-            return 'Medium'
-        else:
-            return 'Hard'
-    except ValueError:
+# Both take the total time in minutes as read from RecipeStore.minutes, so times are parsed once per snapshot
+def calculate_difficulty(total_time):
+    if np.isnan(total_time):
         return 'unknown'
-
-def calculate_servings(prep_time, cooking_time):
-    try:
-        total_time = float(prep_time) + float(cooking_time)
-        if total_time < 30:
-            return '1 - 2 Servings'
-        elif total_time < 60:
-            return '4 - 6 Servings'
-        else:
-            return '6+ Servings'
-    except ValueError:
+    if total_time < 30:
+        return 'Easy'
+    elif total_time < 60:
+        return 'Medium'
+    else:
+        return 'Hard'
+
+def calculate_servings(total_time):
+    if np.isnan(total_time):
         return 'unknown'
+    if total_time < 30:
+        return '1 - 2 Servings'
+    elif total_time < 60:
+        return '4 - 6 Servings'
+    else:
+        return '6+ Servings'
+
+def filter_mask(snapshot, user_cuisine, user_course, user_veg, strict=False):
+    # Resolve filters with bitwise operations on the precomputed facet bitmaps
+    facet_index = snapshot.facet_index
+    # Deleted (tombstoned) recipes are never candidates
+    mask = snapshot.live.copy()
+    if user_veg:
+        mask &= facet_index.equals('diet', 'vegetarian')
+
+    # In strict mode cuisine and course filter the candidates instead of only boosting them
+    if strict and user_cuisine:
+        mask &= facet_index.contains('cuisine', user_cuisine)
+    if strict and user_course:
+        mask &= facet_index.contains('course', user_course)
+
+    return mask
 
 # Update the recommend_recipes function
-def recommend_recipes(user_ingredients, user_cuisine, user_course, user_veg):
-    # Filter vegetarian recipes if requested
-    filtered_recipes = recipes_data[recipes_data['diet'].str.strip().str.lower() == "vegetarian"] if user_veg else recipes_data
+def recommend_recipes(user_ingredients, user_cuisine, user_course, user_veg, strict=False, offset=0, limit=24, engine=None,
+                      snapshot=None):
+    # Every read below goes through one snapshot, even if a reload swaps in a new one meanwhile
+    snapshot = snapshot or snapshots.current
+    preference_scorer = snapshot.preference_scorer
+    inverted_index = snapshot.inverted_index
 
-    # # Filter by cuisine and course if provided
-    # if user_cuisine:
-    #     filtered_recipes = filtered_recipes[filtered_recipes['cuisine'].str.lower().apply(lambda x: any(c.lower() in x for c in user_cuisine))]
-    # if user_course:
-    #     filtered_recipes = filtered_recipes[filtered_recipes['course'].str.lower().str.contains(user_course.lower())]
+    mask = filter_mask(snapshot, user_cuisine, user_course, user_veg, strict)
+    filtered_rows = np.flatnonzero(mask)
 
     # If no recipes match the filters, return an empty list
-    if filtered_recipes.empty:
+    if len(filtered_rows) == 0:
         return []
 
     # Transform user input
     user_ingredients_text = " ".join(user_ingredients)
-    user_vector = vectorizer.transform([user_ingredients_text])
+    user_vector = snapshot.vectorizer.transform([user_ingredients_text])
+
+    engine = engine or default_engine
+    if engine == 'maxscore':
+        # Prune with per-term upper bounds; only recipes that can still make the page are scored
+        boosts = preference_scorer.boosts(user_cuisine, user_course)
+        top_rows = inverted_index.top_k(user_vector, limit, offset, scale=preference_scorer.similarity_weight,
+                                        boosts=boosts, mask=None if len(filtered_rows) == len(mask) else mask)
+    else:
+        # Calculate cosine similarity with the selected engine
+        if engine == 'inverted':
+            similarities = inverted_index.similarities(user_vector, rows=filtered_rows)
+        else:
+            similarities = cosine_similarity(user_vector, snapshot.recipe_vectors[filtered_rows]).flatten()
 
-    # Calculate cosine similarity
-    similarities = cosine_similarity(user_vector, recipe_vectors[filtered_recipes.index]).flatten()
+        # Calculate weighted similarity for all recipes at once
+        weighted_similarities = preference_scorer.score(similarities, user_cuisine, user_course, rows=filtered_rows)
 
-    # Calculate weighted similarity for each recipe
-    weighted_similarities = [
-        calculate_weighted_similarity(sim, filtered_recipes.iloc[idx], user_cuisine, user_course)
-        for idx, sim in enumerate(similarities)
-    ]
+        # Get the requested page of recommendations without sorting every score
+        top_rows = filtered_rows[top_k(weighted_similarities, limit, offset)]
 
-    # Get top 24 recommendations
-    top_n_indices = np.argsort(weighted_similarities)[-24:][::-1]
-    top_recipes = filtered_recipes.iloc[top_n_indices]
+    return prepare_recommendations(snapshot, top_rows, offset)
 
-    # Use multithreading for preparing recommendations
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        recommendations = list(executor.map(
-            lambda args: prepare_recommendation(*args),
-            [(count, row) for count, (_, row) in enumerate(top_recipes.iterrows(), start=1)]
-        ))
+def recommend_recipes_batch(queries, snapshot=None):
+    snapshot = snapshot or snapshots.current
+    preference_scorer = snapshot.preference_scorer
 
-    return recommendations
+    # Vectorize every pantry in one call and score them all with a single sparse product
+    user_vectors = snapshot.vectorizer.transform([" ".join(query['ingredients']) for query in queries])
+    similarities = cosine_similarity(user_vectors, snapshot.recipe_vectors)
+
+    # Preference boosts for every (query, recipe) pair at once
+    weighted_similarities = similarities * preference_scorer.similarity_weight + preference_scorer.batch_boosts(
+        [query['cuisine'] for query in queries], [query['course'] for query in queries])
+
+    results = []
+    for query, scores in zip(queries, weighted_similarities):
+        filtered_rows = np.flatnonzero(filter_mask(snapshot, query['cuisine'], query['course'], query['veg'],
+                                                   query['strict']))
+        top_rows = filtered_rows[top_k(scores[filtered_rows], query['limit'], query['offset'])]
+        results.append(prepare_recommendations(snapshot, top_rows, query['offset']))
+    return results
+
+def prepare_recommendations(snapshot, top_rows, offset=0):
+    # Cards are precomputed at load, so a response only gathers them by row
+    recipe_cards = snapshot.recipe_cards
+    return [{'id': count, **recipe_cards[row]} for count, row in enumerate(top_rows, start=offset + 1)]
+
+def parse_recommend_request(data):
+    # Canonicalize so equivalent requests share a cache entry and compute the same thing;
+    # raises ValueError for a malformed offset/limit
+    offset, limit = parse_page(data)
+    return {
+        'ingredients': list(canonical_ingredients(data.get('ingredients', []))),
+        'cuisine': list(canonical_cuisine(data.get('cuisine', []))),
+        'course': canonical_course(data.get('course', '')),
+        'veg': bool(data.get('veg', False)),
+        'strict': bool(data.get('strict', False)),
+        'offset': offset,
+        'limit': limit,
+    }
+
+def cache_key(endpoint, query, *extra):
+    return (endpoint, tuple(query['ingredients']), tuple(query['cuisine']), query['course'], query['veg'],
+            query['strict'], query['offset'], query['limit']) + extra
 
 @app.route('/api/recommend-ai', methods=['POST'])
 def recommend_recipes_api():
     start_time = time.time()
     data = request.json
 
-    user_ingredients = data.get('ingredients', [])
-    user_cuisine = data.get('cuisine', [])
-    user_course = data.get('course', '')
-    user_veg = data.get('veg', False)
-
-    recommendations = recommend_recipes(user_ingredients, user_cuisine, user_course, user_veg)
+    try:
+        query = parse_recommend_request(data)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    engine = data.get('engine', default_engine)
+
+    if engine not in recommend_engines:
+        return jsonify({"error": f"Unknown engine '{engine}', expected one of {list(recommend_engines)}"}), 400
+
+    key = cache_key('recommend-ai', query, engine)
+    cached, recommendations = result_cache.get(key)
+    if not cached:
+        snapshot = snapshots.current
+        recommendations = recommend_recipes(query['ingredients'], query['cuisine'], query['course'], query['veg'],
+                                            query['strict'], query['offset'], query['limit'], engine, snapshot)
+        result_cache.put(key, recommendations, version=snapshot.version)
 
     end_time = time.time()
     execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
@@ -136,52 +227,72 @@ def recommend_recipes_api():
         'execution_time': round(execution_time, 2),  # Round to 2 decimal places
     })
 
-def prepare_recommendation(count, row):
-    return {
-        'id': count,
-        'title': row['name'].strip(),
-        'difficulty': calculate_difficulty(row['prep_time'], row['cook_time']),
-        'cooking_time': row['cook_time'].strip(),
-        'image': row['image_url'].strip(),
-        'veg': row['diet'].strip().lower() == 'vegetarian',
-        'cuisine': row['cuisine'].strip(),
-        'course': row['course'].strip(),
-        'servings': calculate_servings(row['prep_time'], row['cook_time']),
-    }
-
-@app.route('/api/recipe', methods=['POST'])
-def recipe():
+@app.route('/api/recommend-ai/batch', methods=['POST'])
+def recommend_recipes_batch_api():
+    start_time = time.time()
     data = request.json
-    name = data.get('name', '').strip().lower()  # Normalize input
 
-    if not name:
-        return jsonify({"error": "Recipe name is required"}), 400
+    queries = data.get('queries', []) if isinstance(data, dict) else None
+    if not isinstance(queries, list) or not all(isinstance(query, dict) for query in queries):
+        return jsonify({"error": "'queries' must be a list of JSON objects"}), 400
+    if len(queries) > max_batch_size:
+        return jsonify({"error": f"At most {max_batch_size} queries per batch"}), 400
 
-    recipes_data = pd.read_csv("7k-dataset.csv")
+    try:
+        queries = [parse_recommend_request(query) for query in queries]
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    # Serve what we can from the cache and score the rest in one batch
+    keys = [cache_key('recommend-ai', query, 'cosine') for query in queries]
+    results = [result_cache.get(key) for key in keys]
+    missing = [i for i, (cached, _) in enumerate(results) if not cached]
+    results = [recommendations for _, recommendations in results]
+    if missing:
+        snapshot = snapshots.current
+        for i, recommendations in zip(missing, recommend_recipes_batch([queries[i] for i in missing], snapshot)):
+            results[i] = recommendations
+            result_cache.put(keys[i], recommendations, version=snapshot.version)
 
-    # Strip spaces from column names
-    recipes_data.columns = recipes_data.columns.str.strip()
+    end_time = time.time()
+    execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
 
-    # Normalize recipe names in the dataset for comparison
-    recipes_data['name'] = recipes_data['name'].str.strip().str.lower()
+    return jsonify({
+        'results': results,
+        'execution_time': round(execution_time, 2),  # Round to 2 decimal places
+    })
 
-    # Find the recipe
-    recipe_list = recipes_data[recipes_data['name'] == name].to_dict('records')
+def clean_text(value):
+    return '' if pd.isna(value) else str(value).strip()
 
-    if not recipe_list:
-        return jsonify({"error": "Recipe not found"}), 404
+def prepare_card(recipe_store, row):
+    recipe = recipe_store.row(row)
+    total_time = recipe_store.total_minutes(row)
+    return {
+        'title': clean_text(recipe['name']),
+        'difficulty': calculate_difficulty(total_time),
+        'cooking_time': clean_text(recipe['cook_time']),
+        'image': clean_text(recipe['image_url']),
+        'veg': clean_text(recipe['diet']).lower() == 'vegetarian',
+        'cuisine': clean_text(recipe['cuisine']),
+        'course': clean_text(recipe['course']),
+        'servings': calculate_servings(total_time),
+    }
 
-    recipe = recipe_list[0]
+def prepare_detail(recipe_store, row):
+    recipe = recipe_store.row(row)
+    recipe['name'] = recipe['name'].strip().lower()
 
     # Calculate difficulty and servings
-    difficulty = calculate_difficulty(recipe.get('prep_time'), recipe.get('cook_time'))
-    servings = calculate_servings(recipe.get('prep_time'), recipe.get('cook_time'))
+    total_time = recipe_store.total_minutes(row)
+    difficulty = calculate_difficulty(total_time)
+    servings = calculate_servings(total_time)
 
     # Prepare the response
     response = {
         'name': recipe.get('name').title(),  # Convert back to title case for response
         'description': recipe.get('description'),
-        'veg': recipe.get('diet').strip().lower() == 'vegetarian',  # Handle potential extra spaces
+        'veg': clean_text(recipe.get('diet')).lower() == 'vegetarian',  # Handle potential extra spaces
         'image': recipe.get('image_url'),
         'cooking_time': f"{recipe.get('prep_time', 0)} + {recipe.get('cook_time', 0)} mins",
         'serving_size': servings,
@@ -191,58 +302,86 @@ def recipe():
         'cooking_instruction': recipe.get('instructions')
     }
 
-    return jsonify(response)
+    # Stored as the exact bytes jsonify would send
+    return app.json.dumps(response, separators=(',', ':')) + "\n"
+
+@app.route('/api/recipe', methods=['POST'])
+def recipe():
+    data = request.json
+    name = data.get('name', '').strip().lower()  # Normalize input
+
+    if not name:
+        return jsonify({"error": "Recipe name is required"}), 400
+
+    # Find the recipe
+    page = snapshots.current.recipe_details.page(name)
+
+    if page is None:
+        return jsonify({"error": "Recipe not found"}), 404
+
+    return app.response_class(page, mimetype=app.json.mimetype)
+
+@app.route('/api/recipe/suggest', methods=['GET'])
+def recipe_suggest():
+    prefix = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', 10, type=int), 0), 50)
+
+    if not prefix:
+        return jsonify([])
+
+    snapshot = snapshots.current
+    return jsonify([
+        {'id': row, 'name': snapshot.recipe_store.value(row, 'name').strip()}
+        for _, row in snapshot.recipe_details.suggest(prefix, limit)
+    ])
+
+def brute_force_recommend(ingredients, cuisine, course, cravings, veg, offset=0, limit=24, snapshot=None):
+    snapshot = snapshot or snapshots.current
+    brute_force_index = snapshot.brute_force_index
+    recipe_store = snapshot.recipe_store
 
-def brute_force_recommend(ingredients, cuisine, course, cravings, veg):
     # Preprocess input
     ingredients = [preprocess_text(ing) for ing in ingredients]
     cuisine = [preprocess_text(c) for c in cuisine]
     course = preprocess_text(course)
     cravings = [preprocess_text(crv) for crv in cravings]
 
-    # Create a copy of the dataframe to avoid modifying the original
-    df_copy = recipes_data.copy()
-
-    # Preprocess dataframe columns
-    df_copy['ingredients_name'] = df_copy['ingredients_name'].apply(preprocess_text)
-    df_copy['cuisine'] = df_copy['cuisine'].apply(preprocess_text)
-    df_copy['course'] = df_copy['course'].apply(preprocess_text)
-    df_copy['description'] = df_copy['description'].apply(preprocess_text)
-
-    # Filter by veg/non-veg
-    if veg:
-        df_copy = df_copy[df_copy['diet'].str.strip().str.lower() == "vegetarian"]
-
-    # Calculate match scores
-    df_copy['ingredient_match'] = df_copy['ingredients_name'].apply(lambda x: sum(ing in x for ing in ingredients))
-    df_copy['cuisine_match'] = df_copy['cuisine'].apply(lambda x: any(c in x for c in cuisine))
-    df_copy['course_match'] = df_copy['course'].apply(lambda x: course in x)
-    df_copy['craving_match'] = df_copy['description'].apply(lambda x: any(crv in x for crv in cravings))
+    # Calculate match scores for every recipe from the precomputed substring indexes
+    ingredient_match = brute_force_index['ingredients_name'].match_counts(ingredients)
+    cuisine_match = brute_force_index['cuisine'].contains_any(cuisine)
+    course_match = brute_force_index['course'].contains(course)
+    craving_match = brute_force_index['description'].contains_any(cravings)
 
     # Calculate total score
-    df_copy['total_score'] = (
-        df_copy['ingredient_match'] * 3 +  # Prioritize ingredient matches
-        df_copy['cuisine_match'] * 2 +
-        df_copy['course_match'] * 2 +
-        df_copy['craving_match']
+    total_score = (
+        ingredient_match * 3 +  # Prioritize ingredient matches
+        cuisine_match * 2 +
+        course_match * 2 +
+        craving_match
     )
 
-    # Sort by total score and get top 24 results
-    results = df_copy.sort_values('total_score', ascending=False).head(24)
-    time.sleep(0.08)
-    # Prepare results for JSON serialization
+    # Select the requested page of results by total score, as row positions
+    if veg or snapshot.has_deleted:
+        # Filter by veg/non-veg and leave out deleted recipes
+        rows = np.flatnonzero(filter_mask(snapshot, [], '', veg))
+        result_rows = rows[top_k(total_score[rows], limit, offset)]
+    else:
+        result_rows = top_k(total_score, limit, offset)
+
+    # Prepare results for JSON serialization, reading only the selected rows
     recommendations = []
-    for _, row in results.iterrows():
+    for row in result_rows.tolist():
+        total_time = recipe_store.total_minutes(row)
         recommendations.append({
-            'id': row.name,  # Use the index as id
-            'title': row['name'],
-            'difficulty': calculate_difficulty(row['prep_time'], row['cook_time']),
-            'cooking_time': row['cook_time'],
-            'image': row['image_url'],
-            'veg': row['diet'].strip().lower() == 'vegetarian',
-            'cuisine': row['cuisine'],
-            'course': row['course'],
-            'servings': calculate_servings(row['prep_time'], row['cook_time']),
+            'id': row,  # Use the row position as id
+            'title': recipe_store.value(row, 'name'),
+            'difficulty': calculate_difficulty(total_time),
+            'cooking_time': recipe_store.value(row, 'cook_time'),
+            'image': recipe_store.value(row, 'image_url'),
+            'veg': recipe_store.value(row, 'diet').strip().lower() == 'vegetarian',
+            'cuisine': brute_force_index['cuisine'].text(row),
+            'course': brute_force_index['course'].text(row),
+            'servings': calculate_servings(total_time),
         })
 
     return recommendations
@@ -251,19 +390,123 @@ def preprocess_text(text):
     # Convert to lowercase and remove special characters
     return re.sub(r'[^a-zA-Z0-9\s]', '', str(text).lower())
 
+def build_brute_force_index(store):
+    """Normalized matching columns, each held as an n-gram substring index so a query never scans every row."""
+    return {
+        column: SubstringIndex([preprocess_text(value) for value in store.column(column)])
+        for column in ('ingredients_name', 'cuisine', 'course', 'description')
+    }
+
+def timed(timer):
+    # Startup phases are reported by /api/startup; background reloads are not timed
+    return timer.phase if timer is not None else (lambda name: nullcontext())
+
+class RecipeSnapshot:
+    """Everything a request reads for one version of the data: vectors, indexes, cards and detail pages."""
+
+    def __init__(self, version, vectorizer, recipe_vectors, recipes_data, timer=None, deleted=None):
+        phase = timed(timer)
+        self.version = version
+        self.vectorizer = vectorizer
+        self.recipe_vectors = recipe_vectors
+
+        # Rows tombstoned by incremental updates stay in the index until it is compacted
+        self.live = np.ones(len(recipes_data), dtype=bool) if deleted is None else ~deleted
+        self.live.setflags(write=False)
+        self.has_deleted = not self.live.all()
+
+        with phase('build preference scorer'):
+            # Precompute cuisine/course codes so preference boosts are applied as array operations
+            self.preference_scorer = PreferenceScorer(recipes_data, cuisine_weight, course_weight)
+
+        with phase('build facet index'):
+            # Build diet/cuisine/course bitmaps once so filtering never scans the string columns
+            self.facet_index = FacetIndex(recipes_data)
+
+        with phase('build inverted index'):
+            # Posting lists over the same vectors for term-at-a-time retrieval
+            self.inverted_index = InvertedIndex(recipe_vectors)
+
+        with phase('build recipe store'):
+            # Everything derived from the DataFrame is built; keep only the compact columnar store for serving
+            self.recipe_store = RecipeStore(recipes_data)
+
+        # Recommendation card for every recipe, built once instead of per request
+        with phase('build recipe cards'):
+            self.recipe_cards = [prepare_card(self.recipe_store, row) for row in range(len(self.recipe_store))]
+
+        with phase('build recipe details'):
+            # Normalized name -> row map and the serialized detail page of every recipe
+            names = np.where(self.live, self.recipe_store.column('name'), None)
+            self.recipe_details = RecipeDetailStore(names, partial(prepare_detail, self.recipe_store))
+
+        with phase('build brute-force text index'):
+            self.brute_force_index = build_brute_force_index(self.recipe_store)
+
+def source_version():
+    """Cheap version of what a snapshot is loaded from: the index CURRENT pointer, or the CSV's mtime and size."""
+    version = current_version(index_dir)
+    return f"index:{version}" if version else f"csv:{dataset_version(dataset_path)}"
+
+def load_snapshot(timer=None):
+    phase = timed(timer)
+    if current_version(index_dir):
+        with phase('load index'):
+            # Memory-map the prebuilt binary index: no CSV parsing and no vectorizer fitting at startup
+            index_artifact = load_index(index_dir)
+            recipes_data = index_artifact.recipes
+            vectorizer = index_artifact.vectorizer
+            recipe_vectors = index_artifact.recipe_vectors
+            data_version = index_artifact.version
+            deleted = index_artifact.deleted
+    else:
+        with phase('read CSV and fit vectorizer'):
+            # No index built yet: read the CSV and fit the TF-IDF vectorizer on the ingredients
+            recipes_data, ingredients_text = load_recipes_csv(dataset_path)
+            if hashing_vectorizer:
+                # Hash the recipes chunk by chunk; only the idf table is kept
+                vectorizer, recipe_vectors = HashingTfidf.fit_chunks(text_chunks(ingredients_text))
+            else:
+                vectorizer = TfidfVectorizer(binary=True)
+                recipe_vectors = vectorizer.fit_transform(ingredients_text)
+            data_version = dataset_version(dataset_path)
+            deleted = None
+            del ingredients_text
+    return RecipeSnapshot(data_version, vectorizer, recipe_vectors, recipes_data, timer, deleted)
+
+def rebuild_index():
+    # Write a new index version from the CSV; setting CURRENT also tells other workers' watches to reload
+    if hashing_vectorizer:
+        build_hashed_index(dataset_path, index_dir)
+    else:
+        build_index(dataset_path, index_dir)
+
+# The current snapshot; reloads build a new one in the background and swap it in. Cached results are dropped
+# just before the swap, and results computed against the old snapshot are not cached afterwards
+snapshots = SnapshotManager(load_snapshot, source_version,
+                            before_swap=lambda snapshot: result_cache.set_version(snapshot.version))
+snapshots.load_initial(partial(load_snapshot, startup))
+
 @app.route('/api/recommend-brute-force', methods=['POST'])
 def recommend_brute_force():
     start_time = time.time()
     data = request.json
-    ingredients = data.get('ingredients', [])
-    cuisine = data.get('cuisine', [])
-    course = data.get('course', '')
-    cravings = data.get('craving', [])
-    veg = data.get('veg', False)
-
-    recommendations = brute_force_recommend(ingredients, cuisine, course, cravings, veg)
-    
-    
+    try:
+        query = parse_recommend_request(data)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    cravings = list(canonical_cuisine(data.get('craving', [])))
+    # The brute-force score counts an ingredient once per time it is given, so repeats stay in the query and key
+    query['ingredients'] = list(canonical_ingredients(data.get('ingredients', []), repeats=True))
+
+    key = cache_key('recommend-brute-force', query, tuple(cravings))
+    cached, recommendations = result_cache.get(key)
+    if not cached:
+        snapshot = snapshots.current
+        recommendations = brute_force_recommend(query['ingredients'], query['cuisine'], query['course'], cravings,
+                                                query['veg'], query['offset'], query['limit'], snapshot)
+        result_cache.put(key, recommendations, version=snapshot.version)
+
     end_time = time.time()
     execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
 
@@ -272,5 +515,86 @@ def recommend_brute_force():
         'execution_time': round(execution_time, 2)  # Round to 2 decimal places
     })
 
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+def admin_denied():
+    if not admin_token:
+        return jsonify({"error": "Admin routes are disabled; set ADMIN_TOKEN to enable them"}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+        return jsonify({"error": "Invalid admin token"}), 403
+    return None
+
+@app.route('/api/admin/reload', methods=['POST'])
+def admin_reload():
+    denied = admin_denied()
+    if denied:
+        return denied
+
+    data = request.get_json(silent=True) or {}
+
+    # With rebuild, write a new index version from the CSV first; otherwise reload what is on disk now
+    started = snapshots.reload(prepare=rebuild_index if data.get('rebuild') else None)
+
+    return jsonify({'started': started, **snapshots.stats()}), 202
+
+@app.route('/api/admin/recipes', methods=['POST'])
+def admin_update_recipes():
+    denied = admin_denied()
+    if denied:
+        return denied
+
+    if not current_version(index_dir):
+        return jsonify({"error": "Incremental updates need a built index; run 'python index_artifact.py build'"}), 409
+    # Checked here rather than left to update_index, which would only fail after the 202 in the background
+    if read_manifest(index_path(index_dir))['vectorizer'].get('hashing'):
+        return jsonify({"error": "The index is hashed and cannot be updated in place; rebuild it with "
+                                 "'python index_artifact.py build --hashing'"}), 409
+
+    data = request.get_json(silent=True) or {}
+    added = data.get('add', [])
+    deleted = data.get('delete', [])
+    if not isinstance(added, list) or not isinstance(deleted, list):
+        return jsonify({"error": "'add' must be a list of recipes and 'delete' a list of recipe names"}), 400
+    # Rejected up front: a malformed recipe would otherwise fail update_index after the 202
+    for recipe in added:
+        columns = {str(column).strip() for column in recipe} if isinstance(recipe, dict) else set()
+        if 'name' not in columns or not columns & {'ingredients', 'ingredients_name'}:
+            return jsonify({"error": "Each added recipe must be an object with 'name' and "
+                                     "'ingredients' or 'ingredients_name'"}), 400
+    if not all(isinstance(name, str) for name in deleted):
+        return jsonify({"error": "Each deleted recipe must be given by name as a string"}), 400
+
+    # Append/tombstone into a new index version without refitting, then swap to it like any reload
+    update = partial(update_index, index_dir, pd.DataFrame(added) if added else None, deleted,
+                     bool(data.get('compact', False)))
+    started = snapshots.reload(prepare=update)
+    if not started:
+        return jsonify({"error": "A reload is already in progress, retry shortly", **snapshots.stats()}), 409
+
+    return jsonify({'started': started, **snapshots.stats()}), 202
+
+@app.route('/api/snapshot', methods=['GET'])
+def snapshot_stats():
+    return jsonify(snapshots.stats())
+
+@app.before_request
+def start_request_timer():
+    request.start_time = time.perf_counter()
+    if reload_interval > 0:
+        # Started from the first request so each pre-forked worker runs its own watch
+        snapshots.watch(reload_interval)
+
+@app.after_request
+def record_first_request(response):
+    if startup.first_request_ms is None and hasattr(request, 'start_time'):
+        startup.record_first_request((time.perf_counter() - request.start_time) * 1000)
+    return response
+
+@app.route('/api/startup', methods=['GET'])
+def startup_report():
+    return jsonify(startup.report())
+
 if __name__ == '__main__':
     app.run(debug=True)
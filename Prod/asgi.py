@@ -0,0 +1,258 @@
+"""Asyncio (ASGI) front end for the recommendation API.
+
+The recommend endpoints are served on the event loop: canonical requests are
+looked up in the result cache, and misses are scored by the API module's
+recommend_recipes / recommend_recipes_batch on a bounded thread pool. Identical
+requests that arrive while one is being scored are coalesced onto that one
+computation (see single_flight.py), so a burst for a trending query costs one
+scoring pass. Every other route is passed through to the Flask app on its own
+thread pool, so slow passthrough requests never queue behind scoring or take its
+threads.
+
+Usage:
+    uvicorn asgi:app [--host 0.0.0.0] [--port 5000]
+
+ASGI_THREADS sets the scoring threads (default 4), ASGI_MAX_PENDING how many
+computations may be queued or running at once (default 64) and
+ASGI_PASSTHROUGH_THREADS the threads for the other routes (default 4).
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from serve import load_api
+from single_flight import SingleFlight
+
+api = load_api(os.environ.get('RECIPE_DATASET', '7k-dataset.csv'))
+
+executor = ThreadPoolExecutor(max_workers=int(os.environ.get('ASGI_THREADS', 4)), thread_name_prefix='score')
+passthrough_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('ASGI_PASSTHROUGH_THREADS', 4)),
+                                          thread_name_prefix='flask')
+max_pending = int(os.environ.get('ASGI_MAX_PENDING', 64))
+flights = SingleFlight()
+pending = None  # asyncio.Semaphore, created on the running loop
+
+
+async def run_scoring(function, *args):
+    """Run a CPU-bound scoring call on the executor, at most max_pending at a time."""
+    global pending
+    if pending is None:
+        pending = asyncio.Semaphore(max_pending)
+    async with pending:
+        return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+
+class BadRequest(Exception):
+    pass
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+def read_json(body):
+    try:
+        data = json.loads(body or b'null')
+    except ValueError:
+        raise BadRequest("Request body must be JSON")
+    if not isinstance(data, dict):
+        raise BadRequest("Request body must be a JSON object")
+    return data
+
+
+async def send_json(send, value, status=200):
+    body = json.dumps(value, separators=(',', ':')).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('latin-1')),
+            (b'access-control-allow-origin', b'*'),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def parse_query(data):
+    if not isinstance(data, dict):
+        raise BadRequest("Each query must be a JSON object")
+    try:
+        return api.parse_recommend_request(data)
+    except ValueError as exc:
+        raise BadRequest(str(exc))
+
+
+async def recommend(data):
+    start_time = time.time()
+
+    query = parse_query(data)
+    engine = data.get('engine', api.default_engine)
+
+    if engine not in api.recommend_engines:
+        raise BadRequest(f"Unknown engine '{engine}', expected one of {list(api.recommend_engines)}")
+
+    key = api.cache_key('recommend-ai', query, engine)
+    cached, recommendations = api.result_cache.get(key)
+    if not cached:
+        def compute():
+            snapshot = api.snapshots.current
+            recommendations = api.recommend_recipes(query['ingredients'], query['cuisine'], query['course'],
+                                                    query['veg'], query['strict'], query['offset'],
+                                                    query['limit'], engine, snapshot)
+            api.result_cache.put(key, recommendations, version=snapshot.version)
+            return recommendations
+
+        recommendations = await flights.run(key, lambda: run_scoring(compute))
+
+    end_time = time.time()
+    execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
+
+    return {
+        'recommendations': recommendations,
+        'execution_time': round(execution_time, 2),  # Round to 2 decimal places
+    }
+
+
+async def recommend_batch(data):
+    start_time = time.time()
+
+    queries = [parse_query(query) for query in data.get('queries', [])]
+
+    if len(queries) > api.max_batch_size:
+        raise BadRequest(f"At most {api.max_batch_size} queries per batch")
+
+    # Serve what we can from the cache, then score the misses nobody else is scoring in one batch
+    keys = [api.cache_key('recommend-ai', query, 'cosine') for query in queries]
+    results = [api.result_cache.get(key) for key in keys]
+    missing = [i for i, (cached, _) in enumerate(results) if not cached]
+    results = [recommendations for _, recommendations in results]
+    if missing:
+        query_by_key = {keys[i]: queries[i] for i in missing}
+
+        def compute(leading):
+            snapshot = api.snapshots.current
+            batch = api.recommend_recipes_batch([query_by_key[key] for key in leading], snapshot)
+            for key, recommendations in zip(leading, batch):
+                api.result_cache.put(key, recommendations, version=snapshot.version)
+            return batch
+
+        computed = await flights.run_many([keys[i] for i in missing], lambda leading: run_scoring(compute, leading))
+        for i, recommendations in zip(missing, computed):
+            results[i] = recommendations
+
+    end_time = time.time()
+    execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
+
+    return {
+        'results': results,
+        'execution_time': round(execution_time, 2),  # Round to 2 decimal places
+    }
+
+
+async def inflight_stats(data):
+    return flights.stats()
+
+
+# Routes served on the event loop; (method, path) -> handler(json body)
+routes = {
+    ('POST', '/api/recommend-ai'): recommend,
+    ('POST', '/api/recommend-ai/batch'): recommend_batch,
+    ('GET', '/api/inflight-stats'): inflight_stats,
+}
+
+
+def wsgi_environ(scope, body):
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server_name),
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').lower()
+        value = value.decode('latin-1')
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'content-length':
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def call_flask(environ):
+    response = []
+
+    def start_response(status, headers, exc_info=None):
+        response[:] = [status, headers]
+
+    chunks = api.app(environ, start_response)
+    try:
+        body = b''.join(chunks)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    status, headers = response
+    return int(status.split(' ', 1)[0]), headers, body
+
+
+async def pass_to_flask(scope, body, send):
+    status, headers, body = await asyncio.get_running_loop().run_in_executor(passthrough_executor, call_flask,
+                                                                             wsgi_environ(scope, body))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown(wait=False)
+            passthrough_executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        raise RuntimeError(f"Unsupported scope type {scope['type']!r}")
+
+    body = await read_body(receive)
+    handler = routes.get((scope['method'], scope['path']))
+    if handler is None:
+        return await pass_to_flask(scope, body, send)
+
+    try:
+        result = await handler(read_json(body) if scope['method'] == 'POST' else {})
+    except BadRequest as exc:
+        return await send_json(send, {"error": str(exc)}, status=400)
+    await send_json(send, result)
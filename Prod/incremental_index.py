@@ -0,0 +1,158 @@
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from hashing_index import smooth_idf, tfidf_weights
+
+
+class IncrementalIndex:
+    """Binary TF-IDF recipe vectors that take added and deleted recipes without a refit.
+
+    Works on the fitted matrix as stored in the index artifact. Because the
+    vectorizer is binary, the nonzero pattern of a row is the set of terms in that
+    recipe. From it the index keeps per-term document frequencies over the live
+    rows.
+
+    Adding recipes tokenizes only the new texts with the vectorizer's analyzer.
+    Unseen terms are appended to the vocabulary as new columns, the new rows are
+    appended to the CSR matrix, and their terms' document frequencies go up.
+    Deleting recipes marks their rows as tombstones and takes their terms back
+    out of the document frequencies. Tombstoned rows stay in the matrix until
+    ``compact()``.
+
+    Document frequencies, and so ``idf()``, are always exact for the live rows.
+    Stored row weights are not: existing rows keep the weights they were given,
+    and new rows are weighted with the idf at the time they were added. Once the
+    rows changed since the last refresh exceed ``refresh_ratio`` of the live
+    rows, ``matrix()`` re-weights every row (one vectorized pass over the
+    nonzeros, no tokenizing). Right after ``refresh()`` or ``compact()``, the
+    similarities are those of a TfidfVectorizer refitted on the live recipes,
+    with the vocabulary columns in a different order.
+    """
+
+    def __init__(self, vocabulary, recipe_vectors, deleted=None, stale_rows=0, refresh_ratio=0.1,
+                 vectorizer_params=None):
+        self.vocabulary = dict(vocabulary)
+        self.analyzer = TfidfVectorizer(**(vectorizer_params or {'binary': True})).build_analyzer()
+        self.refresh_ratio = refresh_ratio
+        self.stale_rows = stale_rows
+
+        matrix = sp.csr_matrix(recipe_vectors, dtype=np.float32)
+        matrix.sort_indices()
+        self._blocks = [matrix]
+        self.size = matrix.shape[0]
+        self.deleted = np.zeros(self.size, dtype=bool) if deleted is None else np.array(deleted, dtype=bool)
+
+        # Document frequency of every term over the live rows
+        rows = np.repeat(np.arange(self.size), np.diff(matrix.indptr))
+        self.df = np.bincount(matrix.indices[~self.deleted[rows]], minlength=len(self.vocabulary))
+
+    @classmethod
+    def fit(cls, texts, **kwargs):
+        index = cls({}, sp.csr_matrix((0, 0), dtype=np.float32), **kwargs)
+        index.add(texts)
+        index.refresh()
+        return index
+
+    @property
+    def n_docs(self):
+        """Number of live (not deleted) rows."""
+        return self.size - int(self.deleted.sum())
+
+    def idf(self):
+        return smooth_idf(self.df, self.n_docs)
+
+    def _term_rows(self, texts, grow):
+        """CSR indptr and sorted term columns of each text; with grow, unseen terms join the vocabulary."""
+        indptr = [0]
+        indices = []
+        for text in texts:
+            terms = set()
+            for token in self.analyzer(text):
+                column = self.vocabulary.get(token)
+                if column is None and grow:
+                    column = self.vocabulary[token] = len(self.vocabulary)
+                if column is not None:
+                    terms.add(column)
+            indices.extend(sorted(terms))
+            indptr.append(len(indices))
+        return np.array(indptr, dtype=np.int64), np.array(indices, dtype=np.int32)
+
+    def add(self, texts):
+        """Append recipes by their ingredients text; returns their row positions."""
+        texts = list(texts)
+        indptr, indices = self._term_rows(texts, grow=True)
+        n_terms = len(self.vocabulary)
+        self.df = np.concatenate([self.df, np.zeros(n_terms - len(self.df), dtype=self.df.dtype)])
+        self.df += np.bincount(indices, minlength=n_terms)
+
+        rows = np.arange(self.size, self.size + len(texts))
+        self.size += len(texts)
+        self.deleted = np.concatenate([self.deleted, np.zeros(len(texts), dtype=bool)])
+        self.stale_rows += len(texts)
+
+        # New rows are weighted with the idf as of now
+        self._blocks.append(sp.csr_matrix((tfidf_weights(indptr, indices, self.idf()), indices, indptr),
+                                          shape=(len(texts), n_terms)))
+        return rows
+
+    def delete(self, rows):
+        """Tombstone rows; returns how many were live."""
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        rows = rows[~self.deleted[rows]]
+        matrix = self._merged()
+        for row in rows:
+            self.df[matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]] -= 1
+        self.deleted[rows] = True
+        self.stale_rows += len(rows)
+        return len(rows)
+
+    def _merged(self):
+        """All rows as one CSR matrix over the current vocabulary, without re-weighting."""
+        n_terms = len(self.vocabulary)
+        if len(self._blocks) > 1 or self._blocks[0].shape[1] != n_terms:
+            self._blocks = [sp.vstack([
+                sp.csr_matrix((block.data, block.indices, block.indptr), shape=(block.shape[0], n_terms))
+                for block in self._blocks
+            ], format='csr', dtype=np.float32)]
+        return self._blocks[0]
+
+    def refresh(self):
+        """Re-weight every row with the current idf."""
+        matrix = self._merged()
+        self._blocks = [sp.csr_matrix((tfidf_weights(matrix.indptr, matrix.indices, self.idf()), matrix.indices,
+                                       matrix.indptr), shape=matrix.shape)]
+        self.stale_rows = 0
+        return self._blocks[0]
+
+    def matrix(self):
+        """The recipe vectors, refreshed first if too many rows changed since the last refresh."""
+        if self.stale_rows > self.refresh_ratio * max(self.n_docs, 1):
+            return self.refresh()
+        return self._merged()
+
+    def compact(self):
+        """Drop tombstoned rows and terms no live row uses, then refresh.
+
+        Returns the old row position of every remaining row, in order.
+        """
+        kept = np.flatnonzero(~self.deleted)
+        matrix = self._merged()[kept]
+        used = self.df > 0
+        columns = np.cumsum(used) - 1
+        matrix = sp.csr_matrix(matrix[:, np.flatnonzero(used)], dtype=np.float32)
+        matrix.sort_indices()
+
+        self.vocabulary = {term: int(columns[column]) for term, column in self.vocabulary.items() if used[column]}
+        self.df = self.df[used]
+        self.size = len(kept)
+        self.deleted = np.zeros(self.size, dtype=bool)
+        self._blocks = [matrix]
+        self.refresh()
+        return kept
+
+    def transform(self, texts):
+        """Query vectors over the current vocabulary and idf, like TfidfVectorizer.transform."""
+        indptr, indices = self._term_rows(texts, grow=False)
+        return sp.csr_matrix((tfidf_weights(indptr, indices, self.idf()), indices, indptr),
+                             shape=(len(indptr) - 1, len(self.vocabulary)))
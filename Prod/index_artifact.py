@@ -0,0 +1,323 @@
+"""Build and load the binary recipe index.
+
+A build writes one versioned directory holding the fitted TF-IDF matrix as raw
+CSR arrays (.npy), the vectorizer vocabulary and idf, and the recipe metadata:
+
+    index/
+        CURRENT                 name of the version to serve
+        <version>/
+            manifest.json
+            data.npy            float32
+            indices.npy         int32
+            indptr.npy          int32
+            idf.npy             float64 (float32 per hash bucket for hashed indexes)
+            vocabulary.json     not written for hashed indexes
+            recipes.json
+            deleted.npy         bool, only when some rows are tombstoned
+
+Loading memory-maps the matrix arrays, so startup does no CSV parsing and no
+vectorizer fitting, and processes that load the same version share the pages.
+
+A version can also be derived from the current one without refitting (see
+incremental_index.py): added recipes are appended, deleted ones tombstoned, and
+the result is written as a new version whose manifest names its parent.
+
+With --hashing the recipes are vectorized chunk by chunk in a hashed feature
+space (see hashing_index.py), and only the per-bucket idf table is stored.
+
+The manifest's 'format' tells readers what a version may contain. Format 1
+always has vocabulary.json and never deleted.npy; format 2 adds hashed
+versions (no vocabulary) and tombstones. Readers refuse formats they do not
+know with IndexFormatError instead of failing on a missing file.
+
+Usage:
+    python index_artifact.py build [--dataset 7k-dataset.csv] [--out index] [--hashing [--n-features N]]
+    python index_artifact.py update [--add new-recipes.csv] [--delete NAME ...] [--compact] [--out index]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from hashing_index import DEFAULT_FEATURES, HashingTfidf, text_chunks
+from incremental_index import IncrementalIndex
+
+FORMAT_VERSION = 2
+READABLE_FORMATS = (1, 2)
+VECTORIZER_PARAMS = {'binary': True}
+
+
+class IndexFormatError(ValueError):
+    """The index version was written in a format this reader does not know."""
+
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def ingredients_text(recipes):
+    """The ingredients text the vectorizer is fitted on, one entry per recipe."""
+    ingredients_column = 'ingredients' if 'ingredients' in recipes.columns else 'ingredients_name'
+    if ingredients_column not in recipes.columns:
+        raise ValueError(f"Neither 'ingredients' nor 'ingredients_name' column found in the dataset. Available columns are: {recipes.columns.tolist()}")
+    return recipes[ingredients_column].apply(lambda x: " ".join(str(x).strip().split(",")))
+
+
+def load_recipes_csv(dataset_path):
+    """Read the dataset and build the ingredients text the vectorizer is fitted on."""
+    recipes = pd.read_csv(dataset_path)
+    recipes.columns = recipes.columns.str.strip()
+    return recipes, ingredients_text(recipes)
+
+
+def write_json(path, value):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(value, f)
+
+
+def build_index(dataset_path, out_dir='index'):
+    """Fit the vectorizer on the dataset and write a new index version. Returns the version name."""
+    recipes, texts = load_recipes_csv(dataset_path)
+    vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
+    recipe_vectors = vectorizer.fit_transform(texts).tocsr()
+    recipe_vectors.sort_indices()
+
+    version = file_digest(dataset_path)[:12]
+    write_version(out_dir, version, recipe_vectors, vectorizer.idf_, vectorizer.vocabulary_, recipes, {
+        'dataset': os.path.basename(dataset_path),
+        'dataset_sha1': file_digest(dataset_path),
+    })
+    set_current_version(out_dir, version)
+    return version
+
+
+def build_hashed_index(dataset_path, out_dir='index', n_features=DEFAULT_FEATURES, chunksize=1000):
+    """Vectorize the dataset in hashed chunks and write a new index version. Returns the version name."""
+    recipes, texts = load_recipes_csv(dataset_path)
+    vectorizer, recipe_vectors = HashingTfidf.fit_chunks(text_chunks(texts, chunksize), n_features)
+
+    version = f"{file_digest(dataset_path)[:12]}-hashing"
+    write_version(out_dir, version, recipe_vectors, vectorizer.idf_, None, recipes, {
+        'dataset': os.path.basename(dataset_path),
+        'dataset_sha1': file_digest(dataset_path),
+    }, vectorizer_params={**VECTORIZER_PARAMS, 'hashing': True, 'n_features': n_features})
+    set_current_version(out_dir, version)
+    return version
+
+
+def write_version(out_dir, version, recipe_vectors, idf, vocabulary, recipes, details, deleted=None,
+                  vectorizer_params=VECTORIZER_PARAMS):
+    """Write one index version directory unless it already exists."""
+    final_dir = os.path.join(out_dir, version)
+    if os.path.isdir(final_dir):
+        return
+
+    # Write into a scratch directory and rename it into place, so readers never see a partial version
+    scratch_dir = os.path.join(out_dir, f".{version}.{os.getpid()}.tmp")
+    os.makedirs(scratch_dir)
+    try:
+        np.save(os.path.join(scratch_dir, 'data.npy'), recipe_vectors.data.astype(np.float32))
+        np.save(os.path.join(scratch_dir, 'indices.npy'), recipe_vectors.indices.astype(np.int32))
+        np.save(os.path.join(scratch_dir, 'indptr.npy'), recipe_vectors.indptr.astype(np.int32))
+        np.save(os.path.join(scratch_dir, 'idf.npy'), idf)
+        if deleted is not None and deleted.any():
+            np.save(os.path.join(scratch_dir, 'deleted.npy'), deleted)
+        if vocabulary is not None:
+            write_json(os.path.join(scratch_dir, 'vocabulary.json'),
+                       {term: int(column) for term, column in vocabulary.items()})
+        write_json(os.path.join(scratch_dir, 'recipes.json'), {
+            'columns': recipes.columns.tolist(),
+            'data': {column: [None if pd.isna(v) else v for v in recipes[column].tolist()] for column in recipes.columns},
+        })
+        write_json(os.path.join(scratch_dir, 'manifest.json'), {
+            'format': FORMAT_VERSION,
+            'version': version,
+            **details,
+            'shape': list(recipe_vectors.shape),
+            'nnz': int(recipe_vectors.nnz),
+            'vectorizer': vectorizer_params,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        })
+        try:
+            os.replace(scratch_dir, final_dir)
+        except OSError:
+            # Another process built the same version meanwhile; keep that one
+            if not os.path.isdir(final_dir):
+                raise
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+        raise
+
+
+def update_index(index_dir='index', add=None, delete=(), compact=False, compact_ratio=0.25):
+    """Derive a new index version from the current one without refitting. Returns the version name.
+
+    ``add`` is a DataFrame of new recipes in the dataset's columns; ``delete`` names
+    recipes to tombstone (matched like recipe lookups, stripped and lowercased).
+    Tombstones are compacted away when asked, or once they exceed compact_ratio
+    of the rows.
+    """
+    path = index_path(index_dir)
+    manifest = read_manifest(path)
+    if manifest['vectorizer'].get('hashing'):
+        raise ValueError(f"Index {path!r} is hashed; rebuild it with 'build --hashing' instead of updating it")
+    recipes = load_recipe_table(path)
+    with open(os.path.join(path, 'vocabulary.json'), encoding='utf-8') as f:
+        vocabulary = json.load(f)
+    index = IncrementalIndex(vocabulary, load_recipe_vectors(path, manifest), deleted=load_deleted(path),
+                             stale_rows=manifest.get('stale_rows', 0), vectorizer_params=manifest['vectorizer'])
+
+    names = {str(name).strip().lower() for name in delete}
+    if names:
+        index.delete(np.flatnonzero(recipes['name'].map(lambda name: str(name).strip().lower()).isin(names)))
+
+    added = 0
+    if add is not None and len(add):
+        add = add.rename(columns=lambda column: str(column).strip())
+        index.add(ingredients_text(add))
+        recipes = pd.concat([recipes, add.reindex(columns=recipes.columns)], ignore_index=True)
+        added = len(add)
+
+    if compact or index.deleted.mean() > compact_ratio:
+        recipes = recipes.iloc[index.compact()].reset_index(drop=True)
+    recipe_vectors = index.matrix()
+
+    # Content-addressed like built versions: the same update of the same parent gives the same version
+    digest = hashlib.sha1(manifest['version'].encode())
+    digest.update(recipe_vectors.data.tobytes())
+    digest.update(recipe_vectors.indices.tobytes())
+    digest.update(index.deleted.tobytes())
+    digest.update(pd.util.hash_pandas_object(recipes.astype(str), index=False).values.tobytes())
+    version = digest.hexdigest()[:12]
+
+    write_version(index_dir, version, recipe_vectors, index.idf(), index.vocabulary, recipes, {
+        'dataset': manifest.get('dataset'),
+        'parent': manifest['version'],
+        'added': added,
+        'deleted': int(index.deleted.sum()),
+        'stale_rows': index.stale_rows,
+    }, deleted=index.deleted)
+    set_current_version(index_dir, version)
+    return version
+
+
+def set_current_version(index_dir, version):
+    pointer = os.path.join(index_dir, 'CURRENT')
+    scratch = f"{pointer}.{os.getpid()}.tmp"
+    with open(scratch, 'w') as f:
+        f.write(version)
+    os.replace(scratch, pointer)
+
+
+def current_version(index_dir):
+    """Version named by index_dir/CURRENT, or None when no index has been built."""
+    try:
+        with open(os.path.join(index_dir, 'CURRENT')) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class IndexArtifact:
+    """A loaded index version: memory-mapped recipe vectors, query vectorizer and recipe table."""
+
+    def __init__(self, path, manifest, recipe_vectors, vectorizer, recipes, deleted=None):
+        self.path = path
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.recipe_vectors = recipe_vectors
+        self.vectorizer = vectorizer
+        self.recipes = recipes
+        self.deleted = deleted
+
+
+def index_path(index_dir='index', version=None):
+    """Directory of the requested (default: current) index version."""
+    version = version or current_version(index_dir)
+    if version is None:
+        raise FileNotFoundError(f"No index found in {index_dir!r}; run 'python index_artifact.py build' first")
+    return os.path.join(index_dir, version)
+
+
+def read_manifest(path):
+    with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') not in READABLE_FORMATS:
+        raise IndexFormatError(f"Index {path!r} has format {manifest.get('format')}, this reader supports "
+                               f"{list(READABLE_FORMATS)}")
+    return manifest
+
+
+def load_recipe_vectors(path, manifest):
+    def array(name):
+        return np.load(os.path.join(path, name), mmap_mode='r')
+
+    return sp.csr_matrix((array('data.npy'), array('indices.npy'), array('indptr.npy')),
+                         shape=tuple(manifest['shape']), copy=False)
+
+
+def load_vectorizer(path, manifest):
+    params = manifest['vectorizer']
+    if params.get('hashing'):
+        return HashingTfidf(np.load(os.path.join(path, 'idf.npy')), params['n_features'])
+    with open(os.path.join(path, 'vocabulary.json'), encoding='utf-8') as f:
+        vocabulary = json.load(f)
+    vectorizer = TfidfVectorizer(**manifest['vectorizer'], vocabulary=vocabulary)
+    vectorizer.idf_ = np.load(os.path.join(path, 'idf.npy'))
+    return vectorizer
+
+
+def load_recipe_table(path):
+    with open(os.path.join(path, 'recipes.json'), encoding='utf-8') as f:
+        table = json.load(f)
+    return pd.DataFrame(table['data'], columns=table['columns'])
+
+
+def load_deleted(path):
+    """Tombstone mask of a version, or None when no row is deleted."""
+    deleted_path = os.path.join(path, 'deleted.npy')
+    return np.load(deleted_path) if os.path.exists(deleted_path) else None
+
+
+def load_index(index_dir='index', version=None):
+    path = index_path(index_dir, version)
+    manifest = read_manifest(path)
+    return IndexArtifact(path, manifest, load_recipe_vectors(path, manifest), load_vectorizer(path, manifest),
+                         load_recipe_table(path), load_deleted(path))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the binary recipe index")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="fit the vectorizer and write a new index version")
+    build.add_argument('--dataset', default='7k-dataset.csv')
+    build.add_argument('--out', default='index')
+    build.add_argument('--hashing', action='store_true', help="hashed feature space with a stored idf table")
+    build.add_argument('--n-features', type=int, default=DEFAULT_FEATURES)
+    update = subparsers.add_parser('update', help="add and delete recipes in the current version without refitting")
+    update.add_argument('--add', help="CSV of recipes to append")
+    update.add_argument('--delete', nargs='*', default=[], metavar='NAME', help="names of recipes to delete")
+    update.add_argument('--compact', action='store_true', help="drop tombstoned rows and unused terms")
+    update.add_argument('--out', default='index')
+    args = parser.parse_args()
+
+    start_time = time.time()
+    if args.command == 'update':
+        version = update_index(args.out, pd.read_csv(args.add) if args.add else None, args.delete, args.compact)
+    elif args.hashing:
+        version = build_hashed_index(args.dataset, args.out, args.n_features)
+    else:
+        version = build_index(args.dataset, args.out)
+    print(f"Wrote index version {version} to {os.path.join(args.out, version)} in {time.time() - start_time:.2f}s")
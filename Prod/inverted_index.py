@@ -0,0 +1,152 @@
+import numpy as np
+from sklearn.preprocessing import normalize
+
+from scoring import top_k
+
+# Slack on the upper bounds so float rounding can never prune a document that belongs in the top k
+BOUND_SLACK = 1e-9
+
+
+class InvertedIndex:
+    """Term-at-a-time retrieval over the fitted TF-IDF matrix.
+
+    Each vocabulary term maps to a posting list of (recipe row, weight), where the
+    weights are the L2-normalized recipe vectors that cosine_similarity would use.
+    A query only walks the posting lists of its own terms, so recipes that share no
+    ingredient with the query are never touched, and the accumulated scores equal the
+    cosine similarities bit for bit.
+    """
+
+    def __init__(self, recipe_vectors, top_list_size=100):
+        postings = normalize(recipe_vectors).tocsc()
+        postings.sort_indices()
+        self.size = recipe_vectors.shape[0]
+        self.indptr = postings.indptr
+        self.rows = postings.indices
+        self.weights = postings.data
+        self._build_bounds(top_list_size)
+
+    def _build_bounds(self, top_list_size):
+        """Per-term maximum weight (the MaxScore upper bound) and the precomputed top list of each term."""
+        lengths = np.diff(self.indptr)
+        terms = np.repeat(np.arange(len(lengths)), lengths)
+        self.max_weights = np.zeros(len(lengths))
+        np.maximum.at(self.max_weights, terms, self.weights)
+
+        # Order each posting list by weight (descending, ties by row) and keep the first entries
+        order = np.lexsort((self.rows, -self.weights, terms))
+        rank = np.arange(len(order)) - np.repeat(self.indptr[:-1], lengths)
+        keep = order[rank < top_list_size]
+        self.top_list_size = top_list_size
+        self.top_indptr = np.concatenate([[0], np.cumsum(np.minimum(lengths, top_list_size))])
+        self.top_rows = self.rows[keep]
+        self.top_weights = self.weights[keep]
+
+    def postings(self, term):
+        start, end = self.indptr[term], self.indptr[term + 1]
+        return self.rows[start:end], self.weights[start:end]
+
+    def query_terms(self, user_vector):
+        """(term, weight) pairs of the normalized query, in vocabulary order."""
+        query = normalize(user_vector).tocsr()
+        order = np.argsort(query.indices)
+        return query.indices[order], query.data[order]
+
+    def similarities(self, user_vector, rows=None):
+        """Cosine similarity of the query to every recipe (or only the given row positions)."""
+        scores = self._accumulate(*self.query_terms(user_vector))
+        return scores if rows is None else scores[rows]
+
+    def _accumulate(self, terms, weights):
+        scores = np.zeros(self.size)
+        for term, weight in zip(terms, weights):
+            posting_rows, posting_weights = self.postings(term)
+            scores[posting_rows] += weight * posting_weights
+        return scores
+
+    def _contributions(self, terms, weights, candidates):
+        """Exact similarity of the (row-sorted) candidates, summed in the same order as similarities()."""
+        scores = np.zeros(len(candidates))
+        for term, weight in zip(terms, weights):
+            posting_rows, posting_weights = self.postings(term)
+            positions = np.searchsorted(posting_rows, candidates)
+            positions[positions == len(posting_rows)] = 0
+            hit = posting_rows[positions] == candidates if len(posting_rows) else np.zeros(len(candidates), dtype=bool)
+            scores[hit] += weight * posting_weights[positions[hit]]
+        return scores
+
+    def _single_term_top_k(self, term, weight, needed, scale, mask):
+        """Answer a one-ingredient query from the precomputed top list, or None if it is too short."""
+        start, end = self.top_indptr[term], self.top_indptr[term + 1]
+        rows, weights = self.top_rows[start:end], self.top_weights[start:end]
+        if mask is not None:
+            keep = mask[rows]
+            rows, weights = rows[keep], weights[keep]
+        if len(rows) < needed:
+            return None
+        scores = (weight * weights) * scale
+        return rows[np.lexsort((rows, -scores))]
+
+    def top_k(self, user_vector, k, offset=0, scale=1.0, boosts=None, mask=None):
+        """Row positions of the ranked page offset..offset+k-1 using MaxScore pruning.
+
+        Scores are ``similarity * scale + boosts[row]``, the same as PreferenceScorer.score,
+        and the ranking (ties by row) is identical to scoring every recipe. The largest
+        boost is added to every term bound, so a document is skipped only when even the
+        best possible cuisine/course boost cannot lift it into the page. ``mask`` restricts
+        the ranking to the rows where it is True.
+        """
+        needed = offset + k
+        terms, weights = self.query_terms(user_vector)
+        max_boost = float(boosts.max()) if boosts is not None and len(boosts) else 0.0
+
+        if len(terms) == 1 and max_boost == 0 and needed <= self.top_list_size:
+            ranked = self._single_term_top_k(terms[0], weights[0], needed, scale, mask)
+            if ranked is not None:
+                return ranked[offset:needed]
+
+        def allowed(rows):
+            return rows if mask is None else rows[mask[rows]]
+
+        accumulated = []
+
+        def score(rows):
+            if accumulated or len(rows) * len(terms) > self.size:
+                # Per-row lookups would cost more than one dense accumulation pass
+                if not accumulated:
+                    accumulated.append(self._accumulate(terms, weights))
+                scores = accumulated[0][rows] * scale
+            else:
+                scores = self._contributions(terms, weights, rows) * scale
+            return scores if boosts is None else scores + boosts[rows]
+
+        # Seed a threshold from the precomputed top lists of the query terms
+        bounds = scale * weights * self.max_weights[terms]
+        threshold = -np.inf
+        if len(terms):
+            seed = np.unique(np.concatenate([self.top_rows[self.top_indptr[t]:self.top_indptr[t + 1]] for t in terms]))
+            seed = allowed(seed)
+            if len(seed) >= needed:
+                seed_scores = score(seed)
+                threshold = np.partition(seed_scores, len(seed) - needed)[len(seed) - needed]
+
+        # Terms whose accumulated bound cannot reach the threshold are non-essential:
+        # a document that only appears in them is never scored
+        order = np.argsort(bounds)
+        reachable = np.cumsum(bounds[order]) * (1 + BOUND_SLACK) + max_boost + BOUND_SLACK
+        essential = terms[order][reachable >= threshold]
+        selected = np.zeros(self.size, dtype=bool)
+        for term in essential:
+            selected[self.postings(term)[0]] = True
+
+        # Documents without any query term score their boost alone
+        if boosts is not None and max_boost >= threshold:
+            selected |= boosts >= threshold
+        if mask is not None:
+            selected &= mask
+        candidates = np.flatnonzero(selected)
+
+        if len(candidates) < needed:
+            # Too few candidates to fill the page: zero-similarity rows take part in the ranking
+            candidates = np.arange(self.size) if mask is None else np.flatnonzero(mask)
+        return candidates[top_k(score(candidates), k, offset)]
@@ -0,0 +1,51 @@
+from bisect import bisect_left
+
+
+def normalize_name(name):
+    return str(name).strip().lower()
+
+
+class RecipeDetailStore:
+    """Recipe detail pages, built once and served without touching the dataset.
+
+    ``row_by_name`` maps a normalized name (stripped, lowercased) to the row of
+    the first recipe with that name, so lookups are one dict access. Each page
+    is serialized ahead of time by ``serialize(row)``, and a request returns the
+    stored bytes as they are.
+
+    Autocomplete uses the distinct normalized names in sorted order. Every name
+    starting with a prefix sits in one contiguous run, found with two binary
+    searches. This is the flattened form of a prefix trie and costs one list
+    instead of a node per character.
+    """
+
+    def __init__(self, names, serialize):
+        self.row_by_name = {}
+        for row, name in enumerate(names):
+            if isinstance(name, str):
+                self.row_by_name.setdefault(normalize_name(name), row)
+        self.pages = {row: serialize(row) for row in self.row_by_name.values()}
+        self.sorted_names = sorted(self.row_by_name)
+
+    def __len__(self):
+        return len(self.row_by_name)
+
+    def find(self, name):
+        """Row of the recipe with this name, or None."""
+        return self.row_by_name.get(normalize_name(name))
+
+    def page(self, name):
+        """Serialized detail page for the name, or None."""
+        row = self.find(name)
+        return None if row is None else self.pages[row]
+
+    def suggest(self, prefix, limit=10):
+        """Up to limit (name, row) pairs whose normalized name starts with the prefix, in name order."""
+        prefix = normalize_name(prefix)
+        start = bisect_left(self.sorted_names, prefix)
+        suggestions = []
+        for name in self.sorted_names[start:start + limit]:
+            if not name.startswith(prefix):
+                break
+            suggestions.append((name, self.row_by_name[name]))
+        return suggestions
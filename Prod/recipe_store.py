@@ -0,0 +1,66 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+def intern_text(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class RecipeStore:
+    """Compact columnar copy of the recipe table for the serving path.
+
+    Low-cardinality columns (cuisine, course, diet) are stored as integer codes
+    into a small category list, prep/cook times additionally as float32 minutes
+    (NaN when missing or unparseable), and every other column as an object array
+    of interned strings so repeated values share one object. Rows are addressed by
+    integer position in O(1) without any pandas indexing.
+    """
+
+    categorical = ('cuisine', 'course', 'diet')
+    numeric = ('prep_time', 'cook_time')
+
+    def __init__(self, recipes, columns=None):
+        columns = [c for c in (columns or recipes.columns) if c in recipes.columns]
+        self.size = len(recipes)
+        self.columns = list(columns)
+        self.codes = {}
+        self.categories = {}
+        self.text = {}
+        self.minutes = {}
+        for column in columns:
+            values = recipes[column]
+            if column in self.categorical:
+                codes, categories = pd.factorize(values)
+                dtype = np.int16 if len(categories) < np.iinfo(np.int16).max else np.int32
+                self.codes[column] = codes.astype(dtype)
+                # Code -1 (missing) picks the trailing NaN
+                self.categories[column] = np.array([intern_text(c) for c in categories] + [np.nan], dtype=object)
+            else:
+                self.text[column] = np.array([intern_text(v) for v in values], dtype=object)
+            if column in self.numeric:
+                self.minutes[column] = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float32)
+
+    def __len__(self):
+        return self.size
+
+    def column(self, name):
+        """Values of a column as an object array, in row order."""
+        if name in self.codes:
+            return self.categories[name][self.codes[name]]
+        return self.text[name]
+
+    def value(self, row, name):
+        if name in self.codes:
+            return self.categories[name][self.codes[name][row]]
+        return self.text[name][row]
+
+    def total_minutes(self, row):
+        """Prep plus cook time of one recipe in minutes, NaN when either is unknown."""
+        return float(self.minutes['prep_time'][row] + self.minutes['cook_time'][row])
+
+    def row(self, row):
+        """All columns of one recipe as a dict."""
+        return {name: self.value(row, name) for name in self.columns}
+
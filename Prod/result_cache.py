@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def canonical_ingredients(ingredients, repeats=False):
+    """Trimmed, lowercased and sorted ingredients, de-duplicated unless ``repeats`` is set."""
+    values = [str(ing).strip().lower() for ing in ingredients or [] if str(ing).strip()]
+    return tuple(sorted(values if repeats else set(values)))
+
+
+def canonical_cuisine(cuisine):
+    if isinstance(cuisine, str):
+        cuisine = [cuisine]
+    return tuple(sorted({str(c).strip().lower() for c in cuisine or [] if str(c).strip()}))
+
+
+def canonical_course(course):
+    return str(course or '').strip().lower()
+
+
+def dataset_version(path):
+    """Version string for a dataset file, changes whenever the file is rewritten."""
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+class ResultCache:
+    """Bounded LRU cache with a per-entry TTL for recommendation results.
+
+    Entries belong to a dataset version; switching to a new version drops every
+    entry so results computed against an older dataset are never served. Lookups
+    and inserts are guarded by a lock because Flask serves requests from threads.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def set_version(self, version):
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.version = version
+
+    def get(self, key):
+        """Return (hit, value) for the key."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value, version=None):
+        """Store a result; one computed for a version other than the current one is dropped."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'version': self.version,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+
+class PreferenceScorer:
+    """Vectorized version of calculate_weighted_similarity.
+
+    Cuisine and course are factorized once at startup into integer codes over their
+    distinct lowercased values. A request only runs its substring checks against the
+    distinct values (a few dozen strings) and gathers the boosts through the codes,
+    so scoring a request is a handful of NumPy operations instead of a Python loop.
+    """
+
+    def __init__(self, recipes, cuisine_weight, course_weight):
+        self.cuisine_weight = cuisine_weight
+        self.course_weight = course_weight
+        self.similarity_weight = 1 - (cuisine_weight + course_weight)
+        self.size = len(recipes)
+        self.cuisine_codes, self.cuisine_values = self._factorize(recipes, 'cuisine')
+        self.course_codes, self.course_values = self._factorize(recipes, 'course')
+
+    @staticmethod
+    def _factorize(recipes, column):
+        if column not in recipes.columns:
+            return None, None
+        codes, values = pd.factorize(recipes[column].fillna('').astype(str).str.lower())
+        return codes.astype(np.int32), list(values)
+
+    def cuisine_matches(self, user_cuisine):
+        """Boolean array over the distinct cuisines, True where any user cuisine is a substring."""
+        wanted = [c.lower() for c in user_cuisine]
+        return np.array([any(c in value for c in wanted) for value in self.cuisine_values], dtype=bool)
+
+    def course_matches(self, user_course):
+        """Boolean array over the distinct courses, True where the user course is a substring."""
+        wanted = user_course.lower()
+        return np.array([wanted in value for value in self.course_values], dtype=bool)
+
+    def boosts(self, user_cuisine, user_course, rows=None):
+        """Preference boost per recipe, optionally restricted to the given row positions."""
+        size = self.size if rows is None else len(rows)
+        boosts = np.zeros(size)
+        if user_cuisine and self.cuisine_codes is not None:
+            codes = self.cuisine_codes if rows is None else self.cuisine_codes[rows]
+            boosts += self.cuisine_weight * self.cuisine_matches(user_cuisine)[codes]
+        if user_course and self.course_codes is not None:
+            codes = self.course_codes if rows is None else self.course_codes[rows]
+            boosts += self.course_weight * self.course_matches(user_course)[codes]
+        return boosts
+
+    def batch_boosts(self, user_cuisines, user_courses):
+        """Preference boosts for several queries at once, one row per query."""
+        boosts = np.zeros((len(user_cuisines), self.size))
+        if self.cuisine_codes is not None and any(user_cuisines):
+            matches = np.array([self.cuisine_matches(c) if c else np.zeros(len(self.cuisine_values), dtype=bool)
+                                for c in user_cuisines])
+            boosts += self.cuisine_weight * matches[:, self.cuisine_codes]
+        if self.course_codes is not None and any(user_courses):
+            matches = np.array([self.course_matches(c) if c else np.zeros(len(self.course_values), dtype=bool)
+                                for c in user_courses])
+            boosts += self.course_weight * matches[:, self.course_codes]
+        return boosts
+
+    def score(self, similarities, user_cuisine, user_course, rows=None):
+        """Weighted similarity for every recipe, identical to calling
+        calculate_weighted_similarity once per row."""
+        similarities = np.asarray(similarities)
+        boosts = self.boosts(user_cuisine, user_course, rows)
+        return similarities * self.similarity_weight + boosts
+
+
+# Largest page a request may ask for
+MAX_PAGE_SIZE = 100
+
+
+def parse_count(value, name):
+    """A non-negative integer request field (ints or digit strings); raises ValueError otherwise."""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"'{name}' must be a non-negative integer")
+    try:
+        count = int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a non-negative integer") from None
+    if count < 0:
+        raise ValueError(f"'{name}' must be a non-negative integer")
+    return count
+
+
+def parse_page(data, default_limit=24, max_limit=MAX_PAGE_SIZE):
+    """(offset, limit) of a request body, with limit capped at max_limit."""
+    offset = parse_count(data.get('offset', 0), 'offset')
+    limit = parse_count(data.get('limit', default_limit), 'limit')
+    return offset, min(limit, max_limit)
+
+
+def top_k(scores, k, offset=0):
+    """Positions of the scores ranked offset..offset+k-1, highest score first.
+
+    Only the top offset + k entries are ever sorted: the cut-off score is found with
+    np.partition and everything above it is ordered with a small lexsort. Ties are
+    broken by position (lower first), so the ranking is deterministic and pages never
+    overlap or skip rows.
+    """
+    scores = np.asarray(scores)
+    end = min(offset + k, len(scores))
+    if end <= offset:
+        return np.empty(0, dtype=np.intp)
+    if end < len(scores):
+        threshold = np.partition(scores, len(scores) - end)[len(scores) - end]
+        above = np.flatnonzero(scores > threshold)
+        tied = np.flatnonzero(scores == threshold)[:end - len(above)]
+        candidates = np.concatenate([above, tied])
+    else:
+        candidates = np.arange(len(scores))
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][offset:end]
@@ -0,0 +1,209 @@
+"""Pre-forking production server for the recommendation API.
+
+The parent process loads 7k-dataset-api.py once, which memory-maps the binary
+index (building it first if needed) and precomputes the scorer, facet bitmaps,
+inverted index and recipe cards. It then binds the listening socket and forks N
+workers that accept from that shared socket. Workers inherit everything the
+parent built:
+
+  * the CSR arrays are file-backed mmaps, so every worker maps the same page
+    cache pages;
+  * the remaining NumPy arrays and Python objects are shared copy-on-write, and
+    gc.freeze() keeps the collector from touching (and so copying) them.
+
+Memory therefore stays close to a single process as workers are added, and
+throughput scales with cores. Each worker serves requests on a bounded pool of
+threads. Result caches are per worker.
+
+Snapshots are per worker too. With RELOAD_INTERVAL set, each worker watches the
+index CURRENT pointer and loads a new version in the background when it moves,
+so one POST /api/admin/reload {"rebuild": true} (which writes the new version)
+updates every worker without a restart. A reloaded snapshot is private to its
+worker rather than shared copy-on-write. The admin routes answer 403 unless
+ADMIN_TOKEN is set and sent in the X-Admin-Token header.
+
+Usage:
+    python serve.py [--host 0.0.0.0] [--port 5000] [--workers N] [--threads 4]
+"""
+import argparse
+import gc
+import importlib.util
+import os
+import signal
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# NumPy/BLAS must not start a thread pool per worker on top of our own threads
+for variable in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+    os.environ.setdefault(variable, '1')
+
+from werkzeug.serving import BaseWSGIServer
+
+from index_artifact import build_hashed_index, build_index, current_version
+
+API_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '7k-dataset-api.py')
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server that handles requests on a fixed-size thread pool."""
+
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, host, port, app, threads, fd):
+        super().__init__(host, port, app, fd=fd)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='request')
+        self.parent_pid = os.getppid()
+
+    def service_actions(self):
+        # Exit with the parent instead of serving on as an orphan
+        if os.getppid() != self.parent_pid:
+            raise SystemExit(0)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        executor = getattr(self, 'executor', None)
+        if executor is not None:
+            executor.shutdown(wait=True)
+        super().server_close()
+
+
+def load_api(dataset_path='7k-dataset.csv', index_dir=None):
+    """Build the index if there is none, then import and return the API module."""
+    index_dir = index_dir or os.environ.get('RECIPE_INDEX_DIR', 'index')
+    os.environ['RECIPE_INDEX_DIR'] = index_dir
+    if not current_version(index_dir):
+        # Serve from the memory-mapped index so workers share the CSR arrays through the page cache;
+        # HASHING_VECTORIZER picks the build the API's own rebuilds would use
+        if os.environ.get('HASHING_VECTORIZER', '0') == '1':
+            version = build_hashed_index(dataset_path, index_dir)
+        else:
+            version = build_index(dataset_path, index_dir)
+        print(f"[serve] built index version {version}", file=sys.stderr)
+
+    spec = importlib.util.spec_from_file_location('recipe_api', API_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['recipe_api'] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_app(dataset_path='7k-dataset.csv', index_dir=None):
+    return load_api(dataset_path, index_dir).app
+
+
+def bind_socket(host, port, backlog=128):
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    listener = socket.socket(family, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(backlog)
+    listener.set_inheritable(True)
+    return listener
+
+
+def run_worker(app, host, port, listener, threads):
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    server = PooledWSGIServer(host, port, app, threads, fd=listener.fileno())
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def fork_worker(app, host, port, listener, threads):
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            run_worker(app, host, port, listener, threads)
+        except SystemExit as exc:
+            status = exc.code or 0
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            status = 1
+        finally:
+            os._exit(status)
+    return pid
+
+
+def serve(host='127.0.0.1', port=5000, workers=None, threads=4, dataset_path='7k-dataset.csv', index_dir=None):
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and not hasattr(os, 'fork'):
+        print("[serve] os.fork is not available on this platform, running a single worker", file=sys.stderr)
+        workers = 1
+
+    start_time = time.time()
+    app = load_app(dataset_path, index_dir)
+    listener = bind_socket(host, port)
+    print(f"[serve] loaded in {time.time() - start_time:.2f}s, listening on {host}:{port} "
+          f"with {workers} worker(s) x {threads} thread(s)", file=sys.stderr)
+
+    if workers == 1:
+        run_worker(app, host, port, listener, threads)
+        return
+
+    # Everything allocated so far is long-lived; move it out of the collector's reach so the
+    # workers' collections never write to (and so copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    children = {fork_worker(app, host, port, listener, threads) for _ in range(workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not stopping:
+            # Replace a worker that died; the new one forks from the same loaded parent
+            print(f"[serve] worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting",
+                  file=sys.stderr)
+            time.sleep(1)
+            children.add(fork_worker(app, host, port, listener, threads))
+    listener.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve the recipe API from pre-forked workers sharing one index")
+    parser.add_argument('--host', default=os.environ.get('HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_WORKERS', 0)) or None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('WEB_THREADS', 4)),
+                        help="request threads per worker")
+    parser.add_argument('--dataset', default='7k-dataset.csv')
+    parser.add_argument('--index-dir', default=None)
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.workers, args.threads, args.dataset, args.index_dir)
@@ -0,0 +1,75 @@
+import asyncio
+import functools
+
+
+class SingleFlight:
+    """Coalesce concurrent computations of the same key on one event loop.
+
+    The first caller for a key (the leader) starts the computation; callers that
+    arrive while it is still running await the same future instead of starting
+    their own, and every waiter gets the leader's result or exception. The key is
+    forgotten as soon as the computation finishes, so this never serves stale
+    results; caching finished results is ResultCache's job.
+
+    The computation runs as its own task, so a waiter going away (a client
+    disconnecting) neither cancels it nor affects the other waiters. Not thread
+    safe: use it from the event loop thread only.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def claim(self, key):
+        """Return (future, leader); the leader must settle the future."""
+        future = self._flights.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return future, False
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        self.leaders += 1
+        return future, True
+
+    def _settle(self, keys, task):
+        for i, key in enumerate(keys):
+            future = self._flights.pop(key)
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result()[i])
+
+    async def run_many(self, keys, compute):
+        """Values for the keys; compute(leading_keys) is awaited for the keys nobody is computing yet.
+
+        compute must return one value per leading key, in order.
+        """
+        futures = []
+        leading = []
+        for key in keys:
+            future, leader = self.claim(key)
+            futures.append(future)
+            if leader:
+                leading.append(key)
+        if leading:
+            task = asyncio.ensure_future(compute(leading))
+            task.add_done_callback(functools.partial(self._settle, leading))
+        return await asyncio.shield(asyncio.gather(*futures))
+
+    async def run(self, key, compute):
+        """Value for the key; compute() is awaited only if no computation for it is in flight."""
+        async def compute_one(_):
+            return [await compute()]
+
+        values = await self.run_many([key], compute_one)
+        return values[0]
+
+    def stats(self):
+        return {
+            'in_flight': len(self._flights),
+            'leaders': self.leaders,
+            'coalesced': self.coalesced,
+        }
@@ -0,0 +1,116 @@
+import threading
+import time
+import weakref
+
+
+class SnapshotManager:
+    """The serving snapshot, rebuilt in the background and swapped in atomically.
+
+    ``load()`` builds a complete snapshot (vectors, indexes, lookup tables) and
+    ``source_version()`` cheaply describes the inputs it is built from. A reload
+    runs on a background thread. It builds the new snapshot beside the current
+    one and then replaces ``current`` with a single assignment. Readers take
+    ``current`` once at the start of a request and use that object throughout,
+    so a request never mixes two versions or sees a half-built one. The
+    replaced snapshot is freed when the last request holding it finishes; until
+    then it is counted as draining in ``stats()``.
+
+    At most one reload runs at a time. A failed reload keeps the current
+    snapshot and records the error.
+    """
+
+    def __init__(self, load, source_version, before_swap=None, clock=time.time):
+        self.load = load
+        self.source_version = source_version
+        self.before_swap = before_swap
+        self.clock = clock
+        self.current = None
+        self.version = None
+        self.loaded_at = None
+        self.loads = 0
+        self.last_error = None
+        self._retired = []
+        self._reloading = None
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    def load_initial(self, load=None):
+        """Load the first snapshot on the calling thread, with ``load`` instead of ``self.load`` if given."""
+        version = self.source_version()
+        self._swap((load or self.load)(), version)
+        return self.current
+
+    def _swap(self, snapshot, version):
+        if self.before_swap is not None:
+            self.before_swap(snapshot)
+        previous = self.current
+        self.current = snapshot
+        self.version = version
+        self.loaded_at = self.clock()
+        self.loads += 1
+        if previous is not None:
+            self._retired = [ref for ref in self._retired if ref() is not None] + [weakref.ref(previous)]
+
+    def _reload(self, prepare):
+        try:
+            if prepare is not None:
+                prepare()
+            version = self.source_version()
+            self._swap(self.load(), version)
+            self.last_error = None
+        except Exception as exc:
+            self.last_error = f"{type(exc).__name__}: {exc}"
+        finally:
+            with self._lock:
+                self._reloading = None
+
+    def reload(self, prepare=None, wait=False):
+        """Start a background reload, first running ``prepare()`` (e.g. an index build) if given.
+
+        Returns False when a reload is already in progress.
+        """
+        with self._lock:
+            if self._reloading is not None:
+                return False
+            self._reloading = threading.Thread(target=self._reload, args=(prepare,), name='snapshot-reload',
+                                               daemon=True)
+            thread = self._reloading
+        thread.start()
+        if wait:
+            thread.join()
+        return True
+
+    def check(self):
+        """Reload if the inputs changed since the current snapshot was loaded."""
+        if self.source_version() != self.version:
+            return self.reload()
+        return False
+
+    def watch(self, interval):
+        """Poll ``source_version()`` every interval seconds on a daemon thread (once per process)."""
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+
+            def poll():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        self.check()
+                    except Exception as exc:
+                        self.last_error = f"{type(exc).__name__}: {exc}"
+
+            self._watcher = threading.Thread(target=poll, name='snapshot-watch', daemon=True)
+            self._watcher.start()
+
+    def stats(self):
+        with self._lock:
+            reloading = self._reloading is not None
+        return {
+            'version': self.version,
+            'loaded_at': self.loaded_at,
+            'loads': self.loads,
+            'reloading': reloading,
+            'draining': sum(ref() is not None for ref in self._retired),
+            'last_error': self.last_error,
+        }
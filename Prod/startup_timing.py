@@ -0,0 +1,50 @@
+import sys
+import time
+from contextlib import contextmanager
+
+
+class PhaseTimer:
+    """Wall-clock breakdown of startup work (imports, data loading, index builds).
+
+    Phases are recorded in the order they finish, like ``python -X importtime`` but
+    at the granularity we care about. ``budget_ms`` is the first-request latency we
+    want to hold; the report flags when startup plus the first request went over it.
+    """
+
+    def __init__(self, budget_ms=None, stream=sys.stderr):
+        self.started = time.perf_counter()
+        self.budget_ms = budget_ms
+        self.stream = stream
+        self.phases = []
+        self.first_request_ms = None
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.phases.append((name, elapsed_ms))
+            if self.stream is not None:
+                print(f"[startup] {name}: {elapsed_ms:.1f} ms", file=self.stream)
+
+    def record_first_request(self, elapsed_ms):
+        if self.first_request_ms is not None:
+            return
+        self.first_request_ms = elapsed_ms
+        since_start_ms = (time.perf_counter() - self.started) * 1000
+        if self.stream is not None:
+            print(f"[startup] first request: {elapsed_ms:.1f} ms ({since_start_ms:.1f} ms since import)", file=self.stream)
+            if self.budget_ms is not None and elapsed_ms > self.budget_ms:
+                print(f"[startup] first request over budget of {self.budget_ms:.0f} ms", file=self.stream)
+
+    def report(self):
+        return {
+            'phases': [{'name': name, 'ms': round(ms, 2)} for name, ms in self.phases],
+            'total_ms': round(sum(ms for _, ms in self.phases), 2),
+            'first_request_ms': None if self.first_request_ms is None else round(self.first_request_ms, 2),
+            'budget_ms': self.budget_ms,
+            'over_budget': (self.budget_ms is not None and self.first_request_ms is not None
+                            and self.first_request_ms > self.budget_ms),
+        }
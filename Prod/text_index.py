@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+
+class SubstringIndex:
+    """Precomputed index answering "which rows contain this substring" for a text column.
+
+    Texts are de-duplicated first (cuisine and course only have a handful of
+    distinct values), and every distinct text is indexed by the character
+    n-grams it contains. A pattern's candidate texts are the intersection of the
+    posting lists of its n-grams, rarest first; candidates are then verified
+    with ``in``, so results are exactly those of ``pattern in text`` for every
+    row while only texts sharing all the pattern's n-grams are ever looked at.
+    Patterns shorter than an n-gram are checked against every distinct text.
+    """
+
+    def __init__(self, texts, gram=3):
+        codes, distinct = pd.factorize(pd.Series(texts, dtype=object).fillna(''))
+        self.codes = codes
+        self.texts = [str(text) for text in distinct]
+        self.size = len(codes)
+        self.gram = gram
+
+        postings = {}
+        for position, text in enumerate(self.texts):
+            for ngram in {text[i:i + gram] for i in range(len(text) - gram + 1)}:
+                postings.setdefault(ngram, []).append(position)
+        self.postings = {ngram: np.array(positions, dtype=np.int32) for ngram, positions in postings.items()}
+
+    def text(self, row):
+        """The indexed text of one row."""
+        return self.texts[self.codes[row]]
+
+    def _distinct_matches(self, pattern):
+        """Boolean mask over the distinct texts that contain the pattern."""
+        matches = np.zeros(len(self.texts), dtype=bool)
+        if len(pattern) < self.gram:
+            candidates = range(len(self.texts))
+        else:
+            ngrams = {pattern[i:i + self.gram] for i in range(len(pattern) - self.gram + 1)}
+            lists = sorted((self.postings.get(ngram) for ngram in ngrams), key=lambda p: -1 if p is None else len(p))
+            if lists[0] is None:
+                return matches
+            candidates = lists[0]
+            for positions in lists[1:]:
+                if len(candidates) == 0:
+                    return matches
+                candidates = np.intersect1d(candidates, positions, assume_unique=True)
+        for position in candidates:
+            if pattern in self.texts[position]:
+                matches[position] = True
+        return matches
+
+    def contains(self, pattern):
+        """Rows whose text contains the pattern (every row for the empty pattern)."""
+        return self._distinct_matches(pattern)[self.codes]
+
+    def contains_any(self, patterns):
+        """Rows whose text contains at least one of the patterns."""
+        matches = np.zeros(len(self.texts), dtype=bool)
+        for pattern in set(patterns):
+            matches |= self._distinct_matches(pattern)
+        return matches[self.codes]
+
+    def match_counts(self, patterns):
+        """Per row, how many of the patterns (with repeats) it contains."""
+        counts = np.zeros(len(self.texts), dtype=np.int64)
+        for pattern, repeats in pd.Series(list(patterns), dtype=object).value_counts(sort=False).items():
+            counts += self._distinct_matches(pattern) * repeats
+        return counts[self.codes]
@@ -1,29 +1,186 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import pandas as pd
-import numpy as np
-import pickle
-from sklearn.metrics.pairwise import cosine_similarity
-import ast
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _startup_timing import PhaseTimer
+
+# Per-phase startup timing; pandas, NumPy and scikit-learn are imported on first use
+startup = PhaseTimer(budget_ms=float(os.environ.get('STARTUP_BUDGET_MS', 8000)))
 
 app = Flask(__name__)
 CORS(app)
 
-# Load the CSV file
-df = pd.read_csv("7k-dataset-with-vectors.csv")
+index_dir = os.environ.get('RECIPE_INDEX_DIR', 'index')
+
+# In lazy mode (the default, for cold serverless starts) nothing heavy happens at import time:
+# each endpoint loads only what it needs the first time it is called
+lazy_startup = os.environ.get('LAZY_STARTUP', '1') == '1'
+load_lock = threading.Lock()
+
+# Optional ANN retrieval ('hnsw', 'ivf' or 'annoy', built with _ann_index.py); unset scores every recipe.
+# Requests can pass 'exact': true, or ef/nprobe/search_k/rerank (capped below) to trade latency for recall
+ann_kind = os.environ.get('ANN_INDEX')
+ann_candidates = int(os.environ.get('ANN_CANDIDATES', 256))
+ann_knobs = {name: int(os.environ[f'ANN_{name.upper()}'])
+             for name in ('ef', 'nprobe', 'search_k') if os.environ.get(f'ANN_{name.upper()}')}
+ann_knob_limits = {'ef': 1024, 'nprobe': 1024, 'search_k': 100000, 'rerank': 4096}
+
+# Score against the low-rank LSA embeddings (built with _lsa.py) instead of the vocabulary-wide vectors
+use_lsa = os.environ.get('LSA_EMBEDDINGS', '0') == '1'
+
+# Retrieve candidates from quantized LSA embeddings ('float16', 'int8' or 'pq', built with _quantized.py):
+# the top QUANTIZED_RERANK rows by quantized score are re-scored exactly and form the candidate pool.
+# They approximate the LSA scores, so this needs LSA_EMBEDDINGS=1; used when no ANN index is configured
+quantized_mode = os.environ.get('QUANTIZED_VECTORS')
+quantized_rerank = int(os.environ.get('QUANTIZED_RERANK', 100))
+
+np = pd = cosine_similarity = None
+df = vectors = vectorizer = facet_index = ann_index = lsa = None
+recipe_cuisines = recipe_courses = None
+# Rows that are not tombstoned (deleted.npy of an incrementally updated index), or None when all are live
+live = None
+# Row positions and sliced matrices per diet partition, so filtered queries only score their own rows
+partitions = {}
+recipe_table = None
+
+def import_numeric():
+    global np, pd, cosine_similarity
+    if cosine_similarity is not None:
+        return
+    with startup.phase('import numpy'):
+        import numpy as np
+    with startup.phase('import pandas'):
+        import pandas as pd
+    with startup.phase('import sklearn.metrics.pairwise'):
+        from sklearn.metrics.pairwise import cosine_similarity
+
+def load_recommender():
+    """Load the recipe vectors, vectorizer, recipe table and facet index for /api/recommend."""
+    global df, vectors, vectorizer, facet_index, ann_index, lsa, recipe_cuisines, recipe_courses, live
+    with load_lock:
+        if facet_index is not None:
+            return
+        import_numeric()
+        with startup.phase('import index modules'):
+            from _facet_index import FacetIndex
+            from _index_artifact import current_version, index_path, read_manifest, \
+                load_recipe_vectors, load_vectorizer, load_recipe_table, load_deleted
+
+        path = None
+        if current_version(index_dir):
+            # Memory-map the prebuilt binary index (see _index_artifact.py) instead of parsing vectors from CSV
+            path = index_path(index_dir)
+            manifest = read_manifest(path)
+            with startup.phase('mmap recipe vectors'):
+                vectors = load_recipe_vectors(path, manifest)
+            with startup.phase('load vectorizer'):
+                vectorizer = load_vectorizer(path, manifest)
+            with startup.phase('load recipe table'):
+                df = load_recipe_table(path)
+            deleted = load_deleted(path)
+            if deleted is not None:
+                live = ~deleted
+        else:
+            import pickle
+            from _vector_store import load_recipe_vectors as load_csv_vectors, read_recipes
+
+            with startup.phase('read CSV'):
+                # Load the CSV file, without the vectors column
+                df = read_recipes("7k-dataset-with-vectors.csv")
+
+            with startup.phase('load vectors'):
+                # Binary vectors written by Tf-vector-caching.py (converted from the CSV column on first use)
+                vectors = load_csv_vectors("7k-dataset-with-vectors.csv")
+
+            with startup.phase('load vectorizer'):
+                # Load the saved TF-IDF vectorizer
+                with open('tfidf_vectorizer.pkl', 'rb') as f:
+                    vectorizer = pickle.load(f)
+
+        with startup.phase('build facet index'):
+            # Build diet/cuisine/course bitmaps once so filtering never scans the string columns
+            facet_index = FacetIndex(df)
+
+        with startup.phase('build preference arrays'):
+            # Values compared by calculate_weighted_similarity, as arrays for vectorized boosts
+            if 'cuisine' in df.columns:
+                recipe_cuisines = df['cuisine'].to_numpy(dtype=object)
+            if 'course' in df.columns:
+                recipe_courses = df['course'].fillna('').astype(str).str.strip().str.lower().to_numpy(dtype=object)
+
+        if use_lsa and path is not None:
+            with startup.phase('mmap LSA embeddings'):
+                from _lsa import LsaEmbeddings
+                try:
+                    lsa = LsaEmbeddings(path)
+                except FileNotFoundError:
+                    print("LSA embeddings not built for this index; scoring the full vectors", file=sys.stderr)
 
-# Convert the 'vector_column' from string to actual list of floats
-df['tfidf_vectors'] = df['tfidf_vectors'].apply(ast.literal_eval)
+        if ann_kind:
+            with startup.phase(f'load {ann_kind} index'):
+                from _ann_index import open_ann_index
+                ann_index = open_ann_index(path, ann_kind, vectors, **ann_knobs)
+        elif quantized_mode and not use_lsa:
+            print("QUANTIZED_VECTORS needs LSA_EMBEDDINGS=1; scoring every recipe", file=sys.stderr)
+        elif quantized_mode and lsa is not None:
+            with startup.phase(f'load {quantized_mode} vectors'):
+                from _quantized import QuantizedMatrix, QuantizedSearchIndex
+                try:
+                    ann_index = QuantizedSearchIndex(QuantizedMatrix.load(path, quantized_mode), lsa,
+                                                     quantized_rerank)
+                except FileNotFoundError:
+                    print(f"{quantized_mode} vectors not built for this index; scoring every recipe",
+                          file=sys.stderr)
 
-# Now convert the list to a NumPy array
-df['tfidf_vectors'] = df['tfidf_vectors'].apply(np.array)
+def load_recipe_table_only():
+    """Load just the recipe table for /api/recipe, without vectors or the vectorizer."""
+    global recipe_table
+    with load_lock:
+        if recipe_table is not None:
+            return recipe_table
+        import_numeric()
+        with startup.phase('load recipe table'):
+            from _index_artifact import current_version, index_path, read_manifest, load_recipe_table, load_deleted
+            if current_version(index_dir):
+                path = index_path(index_dir)
+                read_manifest(path)
+                recipe_table = load_recipe_table(path)
+                deleted = load_deleted(path)
+                if deleted is not None:
+                    # The table is only used for name lookups, so tombstoned recipes can simply be dropped
+                    recipe_table = recipe_table[~deleted].reset_index(drop=True)
+            else:
+                from _vector_store import read_recipes
+                recipe_table = read_recipes("7k-dataset-with-vectors.csv")
+            # Strip spaces from column names
+            recipe_table.columns = recipe_table.columns.str.strip()
+        return recipe_table
 
-# After this, you can use the vector values as needed
-vectors = np.stack(df['tfidf_vectors'].values)
+@app.before_request
+def start_request_timer():
+    request.start_time = time.perf_counter()
 
-# Load the saved TF-IDF vectorizer
-with open('tfidf_vectorizer.pkl', 'rb') as f:
-    vectorizer = pickle.load(f)
+@app.after_request
+def record_first_request(response):
+    if startup.first_request_ms is None and hasattr(request, 'start_time'):
+        startup.record_first_request((time.perf_counter() - request.start_time) * 1000)
+    return response
+
+@app.errorhandler(ValueError)
+def index_unreadable(error):
+    # The index was written in a format this deployment cannot read (see _index_artifact.read_manifest)
+    from _index_artifact import IndexFormatError
+    if not isinstance(error, IndexFormatError):
+        raise error
+    return jsonify({"error": str(error)}), 503
+
+@app.route('/api/startup', methods=['GET'])
+def startup_report():
+    return jsonify({**startup.report(), 'lazy': lazy_startup})
 
 def calculate_difficulty(prep_time, cooking_time):
     try:
@@ -58,6 +215,77 @@ def calculate_weighted_similarity(similarity, recipe, user_cuisine, user_course)
     weighted_similarity = similarity * 0.5 + user_pref_similarity
     return weighted_similarity
 
+def filter_mask(user_cuisine, user_course, user_veg, strict=False):
+    """Facet mask for the request (always excluding tombstoned rows), or None when every recipe is a candidate."""
+    if not (user_veg or (strict and (user_cuisine or user_course))):
+        return live
+    mask = facet_index.all() if live is None else live.copy()
+    if user_veg:
+        mask &= facet_index.equals('diet', 'vegetarian')
+
+    # In strict mode cuisine and course filter the candidates instead of only boosting them
+    if strict and user_cuisine:
+        mask &= facet_index.equals('cuisine', user_cuisine)
+    if strict and user_course:
+        mask &= facet_index.equals('course', user_course)
+    return mask
+
+def candidate_matrix(matrix, rows, partition=None):
+    """Rows of the matrix to score; diet partitions are sliced once and reused."""
+    if rows is None:
+        return matrix
+    if partition is None:
+        return matrix[rows]
+    key = (partition, id(matrix))
+    if key not in partitions:
+        partitions[key] = matrix[rows]
+    return partitions[key]
+
+def request_knobs(data):
+    """Per-request ANN knobs as positive ints capped at ann_knob_limits; raises ValueError on bad values."""
+    knobs = {}
+    for name, limit in ann_knob_limits.items():
+        value = data.get(name)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            raise ValueError(f"'{name}' must be a positive integer")
+        knobs[name] = min(value, limit)
+    return knobs
+
+def score_rows(user_sparse_vector, rows, partition=None):
+    """Similarity of the query to the given rows (all rows when None)."""
+    if use_lsa and lsa is not None:
+        # Project the query into the LSA space and score against the compact embeddings
+        return candidate_matrix(lsa.embeddings, rows, partition) @ lsa.project(user_sparse_vector)
+    user_vector = np.asarray(user_sparse_vector.todense())
+
+    # Calculate cosine similarity against the candidate rows only
+    return cosine_similarity(user_vector, candidate_matrix(vectors, rows, partition)).flatten()
+
+def boosted_rows(user_cuisine, user_course, mask=None):
+    """Rows (within the mask) whose cuisine or course may earn a preference boost."""
+    boosted = facet_index.none()
+    if user_cuisine:
+        boosted |= facet_index.equals('cuisine', user_cuisine)
+    if user_course:
+        boosted |= facet_index.equals('course', user_course)
+    if mask is not None:
+        boosted &= mask
+    return np.flatnonzero(boosted)
+
+def preference_boosts(rows, user_cuisine, user_course):
+    """calculate_weighted_similarity's cuisine/course terms for the given rows (all rows when None)."""
+    size = len(df) if rows is None else len(rows)
+    boosts = np.zeros(size)
+    if user_cuisine and recipe_cuisines is not None:
+        cuisines = recipe_cuisines if rows is None else recipe_cuisines[rows]
+        boosts[cuisines == user_cuisine] += 0.2
+    if user_course and recipe_courses is not None:
+        courses = recipe_courses if rows is None else recipe_courses[rows]
+        boosts[courses == user_course.strip().lower()] += 0.3
+    return boosts
+
 @app.route('/api/recommend', methods=['POST'])
 def recommend_recipes():
     data = request.json
@@ -65,26 +293,53 @@ def recommend_recipes():
     user_cuisine = data.get('cuisine')
     user_course = data.get('course')
     user_veg = data.get('veg', False)
+    strict = data.get('strict', False)
+
+    try:
+        knobs = request_knobs(data)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
-    # Filter vegetarian recipes if requested
-    filtered_recipes = df[df['diet'].str.strip().str.lower() == "vegetarian"] if user_veg else df
+    load_recommender()
 
     # Transform user input
     user_ingredients_text = " ".join(user_ingredients)
-    user_vector = np.asarray(vectorizer.transform([user_ingredients_text]).todense())
+    user_sparse_vector = vectorizer.transform([user_ingredients_text])
+
+    # Resolve diet (and in strict mode cuisine/course) filters to row positions before scoring
+    mask = filter_mask(user_cuisine, user_course, user_veg, strict)
+    partition = 'vegetarian' if user_veg and not (strict and (user_cuisine or user_course)) else None
+    if mask is not None and mask is live:
+        # Only the tombstones are excluded; slice the live rows once, like a diet partition
+        partition = 'live'
 
-    # Calculate cosine similarity
-    similarities = cosine_similarity(user_vector, vectors).flatten()
+    top_rows = None
+    if ann_index is not None and not data.get('exact', False):
+        # The ANN candidates are the nearest recipes by similarity alone. A cuisine/course boost (up to 0.5)
+        # outweighs most similarity gaps, so every boosted recipe is added to the pool and scored exactly;
+        # only the unboosted part of the ranking depends on ANN recall
+        rows, _ = ann_index.search(user_sparse_vector, ann_candidates, **knobs)
+        if mask is not None:
+            rows = rows[mask[rows]]
+        # A selective filter can leave too few candidates; score the filtered rows exactly instead
+        if mask is None or len(rows) >= 12:
+            rows = np.union1d(rows, boosted_rows(user_cuisine, user_course, mask))
+            weighted_similarities = (score_rows(user_sparse_vector, rows) * 0.5
+                                     + preference_boosts(rows, user_cuisine, user_course))
+            top_rows = rows[np.argsort(weighted_similarities)[-12:][::-1]]
 
-    # Calculate weighted similarity for each recipe
-    weighted_similarities = [
-        calculate_weighted_similarity(sim, filtered_recipes.iloc[idx], user_cuisine, user_course)
-        for idx, sim in enumerate(similarities)
-    ]
+    if top_rows is None:
+        rows = None if mask is None else np.flatnonzero(mask)
+        similarities = score_rows(user_sparse_vector, rows, partition)
 
-    # Get top 12 recommendations
-    top_n_indices = np.argsort(weighted_similarities)[-12:][::-1]
-    top_recipes = filtered_recipes.iloc[top_n_indices]
+        # Calculate weighted similarity for each candidate
+        weighted_similarities = similarities * 0.5 + preference_boosts(rows, user_cuisine, user_course)
+
+        # Get top 12 recommendations, as positions in the full table
+        top_n_indices = np.argsort(weighted_similarities)[-12:][::-1]
+        top_rows = top_n_indices if rows is None else rows[top_n_indices]
+
+    top_recipes = df.iloc[top_rows]
 
     recommendations = []
     for count, (_, row) in enumerate(top_recipes.iterrows(), start=1):
@@ -110,21 +365,19 @@ def recipe():
     if not name:
         return jsonify({"error": "Recipe name is required"}), 400
 
-    recipes_data = pd.read_csv("7k-dataset-with-vectors.csv")
-
-    # Strip spaces from column names
-    recipes_data.columns = recipes_data.columns.str.strip()
+    recipes_data = load_recipe_table_only()
 
     # Normalize recipe names in the dataset for comparison
-    recipes_data['name'] = recipes_data['name'].str.strip().str.lower()
+    names = recipes_data['name'].str.strip().str.lower()
 
     # Find the recipe
-    recipe_list = recipes_data[recipes_data['name'] == name].to_dict('records')
+    recipe_list = recipes_data[names == name].to_dict('records')
 
     if not recipe_list:
         return jsonify({"error": "Recipe not found"}), 404
 
     recipe = recipe_list[0]
+    recipe['name'] = recipe['name'].strip().lower()
 
     # Calculate difficulty and servings
     difficulty = calculate_difficulty(recipe.get('prep_time'), recipe.get('cook_time'))
@@ -147,5 +400,8 @@ def recipe():
     return jsonify(response)
 
 
+if not lazy_startup:
+    load_recommender()
+
 if __name__ == '__main__':
     app.run(debug=True)
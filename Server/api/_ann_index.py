@@ -0,0 +1,246 @@
+"""Approximate nearest neighbour indexes over the recipe vectors.
+
+An ANN index is built offline next to a binary index version (see
+_index_artifact.py) and answers "most cosine-similar recipes to this query"
+without scoring every recipe, so retrieval cost stays roughly flat as the
+corpus grows. Vectors are L2-normalized, so inner product equals cosine.
+
+    hnsw    faiss IndexHNSWFlat   knobs: m, ef_construction; ef at query time
+    ivf     faiss IndexIVFFlat    knobs: nlist; nprobe at query time
+    annoy   annoy AnnoyIndex      knobs: n_trees; search_k at query time
+
+Higher ef / nprobe / search_k trade latency for recall. ExactIndex is the exact
+fallback, used when the index file or the library is missing.
+
+Usage:
+    python _ann_index.py build --kind hnsw [--index-dir index] [--m 32] [--ef-construction 200]
+    python _ann_index.py build --kind ivf [--nlist 64]
+    python _ann_index.py build --kind annoy [--n-trees 50]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+
+ANN_KINDS = ('hnsw', 'ivf', 'annoy')
+DEFAULT_BUILD_PARAMS = {
+    'hnsw': {'m': 32, 'ef_construction': 200},
+    'ivf': {'nlist': 64},
+    'annoy': {'n_trees': 50},
+}
+DEFAULT_SEARCH_PARAMS = {'ef': 64, 'nprobe': 8, 'search_k': -1}
+
+
+def normalized_query(query_vector):
+    query = query_vector.toarray() if sp.issparse(query_vector) else np.asarray(query_vector)
+    return normalize(query.reshape(1, -1).astype(np.float32))
+
+
+def dense_rows(vectors, chunk_size=4096):
+    """L2-normalized float32 rows of the (sparse or dense) matrix, chunk by chunk."""
+    for start in range(0, vectors.shape[0], chunk_size):
+        chunk = vectors[start:start + chunk_size]
+        chunk = chunk.toarray() if sp.issparse(chunk) else np.asarray(chunk)
+        yield normalize(chunk.astype(np.float32))
+
+
+def top_rows(similarities, k):
+    """Rows of the k largest similarities, best first, ties by lower row."""
+    k = min(k, len(similarities))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-similarities, k - 1)[:k]
+    return candidates[np.lexsort((candidates, -similarities[candidates]))]
+
+
+class ExactIndex:
+    """Exact cosine search by scoring every recipe; the fallback for the ANN indexes."""
+
+    kind = 'exact'
+
+    def __init__(self, vectors):
+        vectors = vectors.astype(np.float32) if sp.issparse(vectors) else np.asarray(vectors, dtype=np.float32)
+        self.vectors = normalize(vectors)
+        self.size = self.vectors.shape[0]
+
+    def search(self, query_vector, k, **knobs):
+        similarities = self.vectors @ normalized_query(query_vector).ravel()
+        similarities = np.asarray(similarities).ravel()
+        rows = top_rows(similarities, k)
+        return rows, similarities[rows]
+
+
+class FaissIndex:
+    """faiss HNSW or IVF index searched by inner product on normalized vectors."""
+
+    def __init__(self, index, kind, ef=None, nprobe=None):
+        self.index = index
+        self.kind = kind
+        self.size = index.ntotal
+        self.ef = ef or DEFAULT_SEARCH_PARAMS['ef']
+        self.nprobe = nprobe or DEFAULT_SEARCH_PARAMS['nprobe']
+
+    def search(self, query_vector, k, ef=None, nprobe=None, **knobs):
+        import faiss
+
+        # Per-call parameters so concurrent requests with different knobs don't race on the index
+        if self.kind == 'hnsw':
+            params = faiss.SearchParametersHNSW(efSearch=max(int(ef or self.ef), k))
+        else:
+            params = faiss.SearchParametersIVF(nprobe=int(nprobe or self.nprobe))
+        similarities, rows = self.index.search(normalized_query(query_vector), k, params=params)
+        found = rows[0] >= 0
+        return rows[0][found].astype(np.int64), similarities[0][found]
+
+
+class AnnoySearchIndex:
+    """annoy angular index; distances are converted back to cosine similarity."""
+
+    kind = 'annoy'
+
+    def __init__(self, index, search_k=None):
+        self.index = index
+        self.size = index.get_n_items()
+        self.search_k = search_k or DEFAULT_SEARCH_PARAMS['search_k']
+
+    def search(self, query_vector, k, search_k=None, **knobs):
+        rows, distances = self.index.get_nns_by_vector(normalized_query(query_vector)[0].tolist(), k,
+                                                       search_k=int(search_k or self.search_k),
+                                                       include_distances=True)
+        # Angular distance is sqrt(2 - 2 cos) for unit vectors
+        distances = np.asarray(distances, dtype=np.float32)
+        return np.asarray(rows, dtype=np.int64), 1 - distances * distances / 2
+
+
+def ann_file(path, kind):
+    return os.path.join(path, f"ann-{kind}.{'ann' if kind == 'annoy' else 'faiss'}")
+
+
+def build_ann_index(vectors, kind, **params):
+    """Build an ANN index of the given kind over the recipe vectors."""
+    params = {**DEFAULT_BUILD_PARAMS[kind], **{k: v for k, v in params.items() if v is not None}}
+    dimension = vectors.shape[1]
+    if kind == 'annoy':
+        from annoy import AnnoyIndex
+
+        index = AnnoyIndex(dimension, 'angular')
+        row = 0
+        for chunk in dense_rows(vectors):
+            for vector in chunk:
+                index.add_item(row, vector.tolist())
+                row += 1
+        index.build(params['n_trees'])
+        return AnnoySearchIndex(index), params
+
+    import faiss
+
+    if kind == 'hnsw':
+        index = faiss.IndexHNSWFlat(dimension, params['m'], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = params['ef_construction']
+    else:
+        # The coarse quantizer needs at least nlist training points
+        params['nlist'] = max(1, min(params['nlist'], vectors.shape[0]))
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFFlat(quantizer, dimension, params['nlist'], faiss.METRIC_INNER_PRODUCT)
+        index.train(np.vstack(list(dense_rows(vectors))))
+    for chunk in dense_rows(vectors):
+        index.add(chunk)
+    return FaissIndex(index, kind), params
+
+
+def save_ann_index(path, kind, ann_index, params):
+    """Write the index into an index version directory, replacing any previous build atomically."""
+    target = ann_file(path, kind)
+    scratch = f"{target}.{os.getpid()}.tmp"
+    if kind == 'annoy':
+        ann_index.index.save(scratch)
+    else:
+        import faiss
+        faiss.write_index(ann_index.index, scratch)
+    os.replace(scratch, target)
+    with open(os.path.join(path, f"ann-{kind}.json"), 'w', encoding='utf-8') as f:
+        json.dump({'kind': kind, 'rows': int(ann_index.size), 'params': params}, f)
+
+
+def load_ann_index(path, kind, ef=None, nprobe=None, search_k=None):
+    """Load a prebuilt index; raises FileNotFoundError or ImportError when it can't be used."""
+    with open(os.path.join(path, f"ann-{kind}.json"), encoding='utf-8') as f:
+        meta = json.load(f)
+    target = ann_file(path, kind)
+    if kind == 'annoy':
+        from annoy import AnnoyIndex
+
+        with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f:
+            dimension = json.load(f)['shape'][1]
+        index = AnnoyIndex(dimension, 'angular')
+        index.load(target)  # memory-mapped
+        ann_index = AnnoySearchIndex(index, search_k)
+    else:
+        import faiss
+        ann_index = FaissIndex(faiss.read_index(target), kind, ef, nprobe)
+    if ann_index.size != meta['rows']:
+        raise ValueError(f"{target} has {ann_index.size} rows, expected {meta['rows']}")
+    return ann_index
+
+
+def open_ann_index(path, kind, vectors, **knobs):
+    """The requested ANN index, or an ExactIndex over the vectors when it is unavailable."""
+    if kind not in ANN_KINDS:
+        return ExactIndex(vectors)
+    try:
+        if path is None:
+            raise FileNotFoundError("no binary index version to load it from")
+        ann_index = load_ann_index(path, kind, **knobs)
+    except (FileNotFoundError, ImportError) as exc:
+        print(f"ANN index '{kind}' unavailable ({exc}); using exact search", file=sys.stderr)
+        return ExactIndex(vectors)
+    if ann_index.size != vectors.shape[0]:
+        print(f"ANN index '{kind}' does not match the recipe vectors; using exact search", file=sys.stderr)
+        return ExactIndex(vectors)
+    return ann_index
+
+
+def recall_at_k(ann_index, exact_index, query_vectors, k=12, **knobs):
+    """Mean fraction of the exact top k that the ANN index also returns."""
+    recalls = []
+    for query_vector in query_vectors:
+        expected, _ = exact_index.search(query_vector, k)
+        found, _ = ann_index.search(query_vector, k, **knobs)
+        recalls.append(len(np.intersect1d(expected, found)) / max(len(expected), 1))
+    return float(np.mean(recalls)) if recalls else 1.0
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from _index_artifact import index_path, read_manifest, load_recipe_vectors
+
+    parser = argparse.ArgumentParser(description="Build an ANN index for the current binary index version")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="build and save an ANN index")
+    build.add_argument('--kind', choices=ANN_KINDS, required=True)
+    build.add_argument('--index-dir', default='index')
+    build.add_argument('--m', type=int)
+    build.add_argument('--ef-construction', type=int)
+    build.add_argument('--nlist', type=int)
+    build.add_argument('--n-trees', type=int)
+    args = parser.parse_args()
+
+    path = index_path(args.index_dir)
+    recipe_vectors = load_recipe_vectors(path, read_manifest(path))
+
+    start_time = time.time()
+    ann_index, params = build_ann_index(recipe_vectors, args.kind, m=args.m, ef_construction=args.ef_construction,
+                                        nlist=args.nlist, n_trees=args.n_trees)
+    save_ann_index(path, args.kind, ann_index, params)
+
+    # Recall of the exact top 12 on a sample of recipes used as queries
+    sample = recipe_vectors[np.random.default_rng(0).choice(recipe_vectors.shape[0],
+                                                            min(200, recipe_vectors.shape[0]), replace=False)]
+    recall = recall_at_k(ann_index, ExactIndex(recipe_vectors), sample)
+    print(f"Built {args.kind} index {params} over {ann_index.size} recipes in {time.time() - start_time:.2f}s; "
+          f"recall@12 {recall:.3f}")
@@ -0,0 +1,61 @@
+# Copy of Prod/facet_index.py for the serverless function; edit the original and copy it over (tests/test_copies.py).
+import numpy as np
+import pandas as pd
+
+
+def normalize_facet(value):
+    return str(value).strip().lower()
+
+
+class FacetIndex:
+    """Precomputed bitmaps (boolean masks over row positions) per diet, cuisine and course value.
+
+    Masks returned by the lookup methods are plain NumPy boolean arrays, so filters
+    are combined with ``&`` (AND), ``|`` (OR) and ``~`` (NOT) and resolved to row
+    positions with ``np.flatnonzero``. Nothing here touches the string columns after
+    the index has been built. Stored bitmaps are read-only; combining them always
+    produces a new array.
+    """
+
+    def __init__(self, recipes, facets=('diet', 'cuisine', 'course')):
+        self.size = len(recipes)
+        self.codes = {}
+        self.values = {}
+        self.bitmaps = {}
+        for facet in facets:
+            if facet not in recipes.columns:
+                continue
+            codes, values = pd.factorize(recipes[facet].fillna('').map(normalize_facet))
+            self.codes[facet] = codes.astype(np.int32)
+            self.values[facet] = list(values)
+            self.bitmaps[facet] = {}
+            for code, value in enumerate(values):
+                bitmap = codes == code
+                bitmap.setflags(write=False)
+                self.bitmaps[facet][value] = bitmap
+
+    def all(self):
+        return np.ones(self.size, dtype=bool)
+
+    def none(self):
+        return np.zeros(self.size, dtype=bool)
+
+    def equals(self, facet, value):
+        """Rows whose facet equals the value (after strip/lowercase)."""
+        bitmap = self.bitmaps.get(facet, {}).get(normalize_facet(value))
+        return bitmap if bitmap is not None else self.none()
+
+    def contains(self, facet, values):
+        """Rows whose facet contains any of the values as a substring."""
+        if isinstance(values, str):
+            values = [values]
+        if facet not in self.values:
+            return self.none()
+        wanted = [normalize_facet(v) for v in values]
+        hits = np.array([any(w in value for w in wanted) for value in self.values[facet]], dtype=bool)
+        matched = np.flatnonzero(hits)
+        if len(matched) == 0:
+            return self.none()
+        if len(matched) == 1:
+            return self.bitmaps[facet][self.values[facet][matched[0]]]
+        return hits[self.codes[facet]]
@@ -0,0 +1,88 @@
+# Copy of Prod/hashing_index.py for the serverless function; edit the original and copy it over (tests/test_copies.py).
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+
+DEFAULT_FEATURES = 2 ** 18
+
+
+def smooth_idf(df, n_docs):
+    # Same formula as TfidfVectorizer(smooth_idf=True)
+    return np.log((1 + n_docs) / (1 + df)) + 1
+
+
+def tfidf_weights(indptr, indices, idf):
+    """L2-normalized binary TF-IDF weights for CSR rows given by their term columns."""
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    weights = idf[indices]
+    norms = np.sqrt(np.bincount(rows, weights * weights, minlength=len(indptr) - 1))
+    norms[norms == 0] = 1
+    return (weights / norms[rows]).astype(np.float32)
+
+
+def make_hasher(n_features):
+    # Same tokenization as TfidfVectorizer(binary=True); terms present in a text become 1 in their bucket
+    return HashingVectorizer(n_features=n_features, binary=True, norm=None, alternate_sign=False)
+
+
+def text_chunks(texts, chunksize=1000):
+    """Split a sequence of texts into lists of at most chunksize."""
+    texts = list(texts)
+    for start in range(0, len(texts), chunksize):
+        yield texts[start:start + chunksize]
+
+
+class HashingTfidf:
+    """Binary TF-IDF over a hashed feature space, with the idf table stored apart from it.
+
+    A term's column is its hash, so no vocabulary is fitted, stored or held in
+    memory, and a query is vectorized without dictionary lookups. The only
+    corpus statistic is ``idf_``, one value per hash bucket. It is built by
+    ``fit_chunks`` in a single streaming pass that hashes each chunk of recipes
+    once and accumulates document frequencies. Buckets no recipe uses get idf 0,
+    so query terms the corpus has never seen are dropped, as TfidfVectorizer
+    drops them.
+
+    Distinct terms that hash to the same bucket are treated as one term. With
+    the default 2**18 buckets and a vocabulary of a few thousand ingredient
+    words, that is rare; testing/compare_methods.py reports the collisions and
+    the resulting ranking differences.
+    """
+
+    def __init__(self, idf, n_features=DEFAULT_FEATURES):
+        self.n_features = n_features
+        self.idf_ = idf
+        self.hasher = make_hasher(n_features)
+
+    @classmethod
+    def fit_chunks(cls, chunks, n_features=DEFAULT_FEATURES):
+        """Vectorize recipes chunk by chunk. Returns (vectorizer, recipe_vectors)."""
+        hasher = make_hasher(n_features)
+        df = np.zeros(n_features, dtype=np.int64)
+        blocks = []
+        for texts in chunks:
+            block = hasher.transform(texts).tocsr()
+            block.sort_indices()
+            df += np.bincount(block.indices, minlength=n_features)
+            blocks.append(block)
+        presence = sp.vstack(blocks, format='csr') if blocks else sp.csr_matrix((0, n_features))
+
+        idf = np.where(df > 0, smooth_idf(df, presence.shape[0]), 0).astype(np.float32)
+        vectorizer = cls(idf, n_features)
+        return vectorizer, vectorizer._weigh(presence)
+
+    def _weigh(self, presence):
+        weighted = sp.csr_matrix((tfidf_weights(presence.indptr, presence.indices, self.idf_), presence.indices,
+                                  presence.indptr), shape=presence.shape)
+        weighted.eliminate_zeros()
+        return weighted
+
+    def transform(self, texts):
+        """Query vectors, like TfidfVectorizer.transform."""
+        presence = self.hasher.transform(texts).tocsr()
+        presence.sort_indices()
+        return self._weigh(presence)
+
+    def buckets(self, terms):
+        """Hash bucket of each term."""
+        return self.hasher.transform(terms).tocsr().indices
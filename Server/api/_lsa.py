@@ -0,0 +1,99 @@
+"""Low-rank (LSA) recipe embeddings for the dense scoring path.
+
+A TruncatedSVD fitted offline on the TF-IDF recipe matrix projects each recipe
+onto `dim` latent dimensions (128-256 is plenty for ingredient lists). The
+embeddings are stored L2-normalized as one contiguous float32 matrix, and the
+same projection is applied to the query at request time, so scoring is a
+(recipes x dim) @ (dim,) product instead of one over the whole vocabulary.
+
+Files written into the index version directory (see _index_artifact.py):
+
+    lsa.json                 dim, explained variance, rows
+    lsa-components.npy       float32 (dim x vocabulary), the projection
+    lsa-embeddings.npy       float32 (recipes x dim), normalized
+
+Usage:
+    python _lsa.py build [--index-dir index] [--dim 192]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+DEFAULT_DIM = 192
+
+
+def fit_lsa(recipe_vectors, dim=DEFAULT_DIM, random_state=0):
+    """Fit the projection; returns (components, normalized embeddings, explained variance ratio)."""
+    dim = max(1, min(dim, recipe_vectors.shape[1] - 1))
+    svd = TruncatedSVD(n_components=dim, algorithm='randomized', n_iter=7, random_state=random_state)
+    embeddings = svd.fit_transform(recipe_vectors.astype(np.float32))
+    components = np.ascontiguousarray(svd.components_, dtype=np.float32)
+    embeddings = np.ascontiguousarray(normalize(embeddings), dtype=np.float32)
+    return components, embeddings, float(svd.explained_variance_ratio_.sum())
+
+
+def save_lsa(path, components, embeddings, explained_variance):
+    for name, array in (('lsa-components.npy', components), ('lsa-embeddings.npy', embeddings)):
+        scratch = os.path.join(path, f".{name}.{os.getpid()}.tmp")
+        with open(scratch, 'wb') as f:
+            np.save(f, array)
+        os.replace(scratch, os.path.join(path, name))
+    with open(os.path.join(path, 'lsa.json'), 'w', encoding='utf-8') as f:
+        json.dump({'dim': int(components.shape[0]), 'rows': int(embeddings.shape[0]),
+                   'explained_variance': explained_variance}, f)
+
+
+class LsaEmbeddings:
+    """Memory-mapped LSA projection and recipe embeddings of one index version."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, 'lsa.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.components = np.load(os.path.join(path, 'lsa-components.npy'), mmap_mode='r')
+        self.embeddings = np.load(os.path.join(path, 'lsa-embeddings.npy'), mmap_mode='r')
+        self.dim = self.components.shape[0]
+        self.size = self.embeddings.shape[0]
+
+    def project(self, query_vector):
+        """Normalized dim-dimensional embedding of a (1 x vocabulary) TF-IDF query vector."""
+        if sp.issparse(query_vector):
+            query_vector = query_vector.tocsr()
+            # Only the columns of the query's terms contribute
+            embedding = query_vector.data.astype(np.float32) @ self.components[:, query_vector.indices].T
+        else:
+            embedding = np.asarray(query_vector, dtype=np.float32).reshape(-1) @ self.components.T
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+
+    def similarities(self, query_vector):
+        """Cosine similarity between the projected query and every recipe embedding."""
+        return self.embeddings @ self.project(query_vector)
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from _index_artifact import index_path, read_manifest, load_recipe_vectors
+
+    parser = argparse.ArgumentParser(description="Fit LSA embeddings for the current binary index version")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="fit TruncatedSVD and save the projection and embeddings")
+    build.add_argument('--index-dir', default='index')
+    build.add_argument('--dim', type=int, default=DEFAULT_DIM)
+    args = parser.parse_args()
+
+    path = index_path(args.index_dir)
+    recipe_vectors = load_recipe_vectors(path, read_manifest(path))
+
+    start_time = time.time()
+    components, embeddings, explained_variance = fit_lsa(recipe_vectors, args.dim)
+    save_lsa(path, components, embeddings, explained_variance)
+    print(f"Wrote {components.shape[0]}-dim LSA embeddings for {embeddings.shape[0]} recipes "
+          f"({embeddings.nbytes / 1e6:.1f} MB, explained variance {explained_variance:.3f}) "
+          f"in {time.time() - start_time:.2f}s")
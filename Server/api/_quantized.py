@@ -0,0 +1,254 @@
+"""Quantized dense recipe vectors with exact float32 re-ranking.
+
+Scoring first runs on a compact copy of the (normalized) recipe matrix and only
+the best `rerank` candidates are re-scored exactly against the float32 rows, so
+the hot loop reads 2x (float16), 4x (int8) or far more (pq) fewer bytes.
+
+    float16   half-precision copy
+    int8      per-dimension scalar quantization: code = round((x - low) / scale),
+              scale = (high - low) / 255 per column, scored as
+              q . x ~= (q * scale) . code + q . low
+    pq        product quantization: the dimensions are split into `subspaces`
+              groups, each row stores the id of its nearest of 256 k-means
+              centroids per group, and a query is scored with one lookup table
+              per group
+
+Fewer bytes only pay off with a kernel that reads them directly. float16 and
+int8 codes are widened to float32 one cache-sized block at a time and scored
+with BLAS; pq rows are a one-hot sparse matrix over the concatenated lookup
+tables. Median scoring time per query on 200,000 x 192 (one core):
+
+    float32 exact   14.4 ms
+    int8            11.4 ms
+    pq               3.5 ms
+    float16         82.5 ms   (NumPy converts half precision without SIMD;
+                               this mode only saves memory and disk)
+
+Quantizing is lossy; build_quantized checks recall against exact search on a set
+of queries and refuses anything below the configured tolerance.
+
+Files written into the index version directory next to lsa-embeddings.npy:
+
+    quantized-<mode>.npz
+
+Usage:
+    python _quantized.py build --mode int8 [--index-dir index] [--min-recall 0.99] [--rerank 100]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+QUANTIZATION_MODES = ('float16', 'int8', 'pq')
+DEFAULT_RERANK = 100
+# Rows converted to float32 per step when scoring float16/int8 codes; sized so the block stays in L2
+SCORE_BLOCK_BYTES = 1 << 20
+
+
+def top_rows(scores, k):
+    """Rows of the k largest scores, best first, ties by lower row."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+def blocked_dot(codes, weights, block_bytes=SCORE_BLOCK_BYTES):
+    """codes @ weights in float32 BLAS, converting one cache-sized block of rows at a time.
+
+    NumPy has no BLAS kernel for float16 or integer operands: ``codes @ weights``
+    either runs a scalar loop (float16) or first upcasts the whole code matrix.
+    Converting into a reused block buffer keeps the converted rows in cache for
+    the float32 matrix-vector product.
+    """
+    weights = np.asarray(weights, dtype=np.float32)
+    rows = max(1, block_bytes // (4 * max(codes.shape[1], 1)))
+    block = np.empty((min(rows, codes.shape[0]), codes.shape[1]), dtype=np.float32)
+    scores = np.empty(codes.shape[0], dtype=np.float32)
+    for start in range(0, codes.shape[0], rows):
+        stop = min(start + rows, codes.shape[0])
+        converted = block[:stop - start]
+        converted[...] = codes[start:stop]
+        np.dot(converted, weights, out=scores[start:stop])
+    return scores
+
+
+class QuantizedMatrix:
+    """Approximate inner products against a quantized copy of a dense float32 matrix."""
+
+    def __init__(self, mode, arrays):
+        self.mode = mode
+        self.arrays = arrays
+        codes = arrays['codes']
+        self.size = codes.shape[0]
+        self.nbytes = sum(array.nbytes for array in arrays.values())
+        self.lookup = None
+        if mode == 'pq':
+            # Row r selects centroid codes[r, g] of every group g; as a one-hot sparse matrix over the
+            # concatenated lookup tables, scoring is one sparse matrix-vector product instead of a gather per group
+            groups = codes.shape[1]
+            columns = (codes.astype(np.int32) + np.arange(groups, dtype=np.int32) * 256).ravel()
+            self.lookup = sp.csr_matrix((np.ones(len(columns), dtype=np.float32), columns,
+                                         np.arange(0, len(columns) + 1, groups, dtype=np.int64)),
+                                        shape=(self.size, groups * 256))
+
+    @classmethod
+    def fit(cls, matrix, mode, subspaces=16, random_state=0):
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if mode == 'float16':
+            return cls(mode, {'codes': matrix.astype(np.float16)})
+        if mode == 'int8':
+            low = matrix.min(axis=0)
+            scale = (matrix.max(axis=0) - low) / 255
+            scale[scale == 0] = 1
+            codes = np.rint((matrix - low) / scale).astype(np.uint8)
+            return cls(mode, {'codes': codes, 'low': low.astype(np.float32), 'scale': scale.astype(np.float32)})
+        if mode == 'pq':
+            from sklearn.cluster import KMeans
+
+            bounds = np.linspace(0, matrix.shape[1], min(subspaces, matrix.shape[1]) + 1).astype(np.int64)
+            centroids = []
+            codes = np.empty((matrix.shape[0], len(bounds) - 1), dtype=np.uint8)
+            for group, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+                kmeans = KMeans(n_clusters=min(256, matrix.shape[0]), n_init=1, random_state=random_state)
+                codes[:, group] = kmeans.fit_predict(matrix[:, start:stop])
+                # Pad every group to the same width so the centroids fit one array
+                padded = np.zeros((256, bounds[1] - bounds[0] + 1), dtype=np.float32)
+                padded[:len(kmeans.cluster_centers_), :stop - start] = kmeans.cluster_centers_
+                centroids.append(padded)
+            return cls(mode, {'codes': codes, 'centroids': np.stack(centroids), 'bounds': bounds})
+        raise ValueError(f"Unknown quantization mode '{mode}', expected one of {list(QUANTIZATION_MODES)}")
+
+    def scores(self, query):
+        """Approximate query . row for every row."""
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        codes = self.arrays['codes']
+        if self.mode == 'float16':
+            return blocked_dot(codes, query)
+        if self.mode == 'int8':
+            return blocked_dot(codes, query * self.arrays['scale']) + np.float32(query @ self.arrays['low'])
+        bounds = self.arrays['bounds']
+        centroids = self.arrays['centroids']
+        tables = np.concatenate([centroids[group, :, :stop - start] @ query[start:stop]
+                                 for group, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:]))])
+        return self.lookup @ tables
+
+    def search(self, query, k, exact_matrix, rerank=DEFAULT_RERANK):
+        """Top k rows by exact inner product among the best `rerank` quantized candidates.
+
+        Exactly `rerank` rows are re-scored, so fewer than k rows come back when rerank < k.
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        # Sorted so the exact rows are read from the (possibly memory-mapped) matrix in order
+        candidates = np.sort(top_rows(np.asarray(self.scores(query), dtype=np.float32), rerank))
+        exact = np.asarray(exact_matrix[candidates], dtype=np.float32) @ query
+        order = top_rows(exact, k)
+        return candidates[order], exact[order]
+
+    def save(self, path):
+        target = os.path.join(path, f"quantized-{self.mode}.npz")
+        scratch = os.path.join(path, f".quantized-{self.mode}.{os.getpid()}.tmp")
+        with open(scratch, 'wb') as f:
+            np.savez(f, **self.arrays)
+        os.replace(scratch, target)
+
+    @classmethod
+    def load(cls, path, mode):
+        with np.load(os.path.join(path, f"quantized-{mode}.npz")) as arrays:
+            return cls(mode, {name: arrays[name] for name in arrays.files})
+
+
+class QuantizedSearchIndex:
+    """Retrieval over LSA embeddings: quantized scoring, then exact float32 re-rank.
+
+    Has the same search() interface as the ANN indexes in _ann_index.py. The
+    candidate pool is the `rerank` best rows by quantized score, so at most
+    rerank rows are returned whatever k is asked for.
+    """
+
+    def __init__(self, quantized, lsa, rerank=DEFAULT_RERANK):
+        self.quantized = quantized
+        self.lsa = lsa
+        self.rerank = rerank
+        self.kind = f"quantized-{quantized.mode}"
+        self.size = quantized.size
+
+    def search(self, query_vector, k, rerank=None, **knobs):
+        return self.quantized.search(self.lsa.project(query_vector), k, self.lsa.embeddings,
+                                     int(rerank or self.rerank))
+
+
+def recall_at_k(quantized, exact_matrix, queries, k=12, rerank=DEFAULT_RERANK):
+    """Mean fraction of the exact top k returned by the quantized search with re-ranking."""
+    recalls = []
+    for query in queries:
+        expected = top_rows(np.asarray(exact_matrix @ query, dtype=np.float32), k)
+        found, _ = quantized.search(query, k, exact_matrix, rerank)
+        recalls.append(len(np.intersect1d(expected, found)) / max(len(expected), 1))
+    return float(np.mean(recalls)) if recalls else 1.0
+
+
+def median_ms(score, queries):
+    """Median wall time of score(query) over the queries, in milliseconds."""
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        score(query)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000 if times else 0.0
+
+
+def build_quantized(matrix, mode, queries, min_recall=0.99, k=12, rerank=DEFAULT_RERANK, **params):
+    """Quantize the matrix and check its recall@k on the queries; raises ValueError below min_recall."""
+    quantized = QuantizedMatrix.fit(matrix, mode, **params)
+    recall = recall_at_k(quantized, matrix, queries, k, rerank)
+    if recall < min_recall:
+        raise ValueError(f"{mode} recall@{k} {recall:.4f} with rerank={rerank} is below {min_recall}; "
+                         f"raise --rerank or use a finer mode")
+    return quantized, recall
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from _index_artifact import index_path, read_manifest, load_vectorizer
+    from _lsa import LsaEmbeddings
+
+    parser = argparse.ArgumentParser(description="Quantize the LSA embeddings of the current index version")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="quantize, check recall and save")
+    build.add_argument('--mode', choices=QUANTIZATION_MODES, required=True)
+    build.add_argument('--index-dir', default='index')
+    build.add_argument('--min-recall', type=float, default=0.99)
+    build.add_argument('--rerank', type=int, default=DEFAULT_RERANK)
+    build.add_argument('--subspaces', type=int, default=16, help="pq only")
+    build.add_argument('--queries', help="JSON file with a list of ingredient lists (default: sampled recipes)")
+    args = parser.parse_args()
+
+    path = index_path(args.index_dir)
+    lsa = LsaEmbeddings(path)
+    embeddings = np.asarray(lsa.embeddings)
+    if args.queries:
+        with open(args.queries, encoding='utf-8') as f:
+            vectorizer = load_vectorizer(path, read_manifest(path))
+            queries = [lsa.project(vectorizer.transform([" ".join(ingredients)])) for ingredients in json.load(f)]
+    else:
+        sample = np.random.default_rng(0).choice(len(embeddings), min(200, len(embeddings)), replace=False)
+        queries = embeddings[sample]
+
+    start_time = time.time()
+    params = {'subspaces': args.subspaces} if args.mode == 'pq' else {}
+    try:
+        quantized, recall = build_quantized(embeddings, args.mode, queries, args.min_recall, rerank=args.rerank,
+                                            **params)
+    except ValueError as exc:
+        sys.exit(str(exc))
+    quantized.save(path)
+    print(f"Wrote {args.mode} vectors ({quantized.nbytes / 1e6:.2f} MB vs {embeddings.nbytes / 1e6:.2f} MB float32), "
+          f"recall@12 {recall:.4f} with rerank={args.rerank}, in {time.time() - start_time:.2f}s")
+    print(f"Scoring: {median_ms(quantized.scores, queries):.2f} ms per query vs "
+          f"{median_ms(embeddings.__matmul__, queries):.2f} ms float32")
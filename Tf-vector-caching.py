@@ -1,6 +1,7 @@
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 import pickle
+from vector_store import file_digest, save_vectors
 
 # Load the dataset
 recipes_data = pd.read_csv('7k-dataset.csv')
@@ -20,11 +21,9 @@ recipe_vectors = vectorizer.fit_transform(recipes_data["ingredients_text"])
 with open('tfidf_vectorizer.pkl', 'wb') as f:
     pickle.dump(vectorizer, f)
 
-# Convert the sparse matrix to a dense format
-recipe_vectors_dense = recipe_vectors.todense()
-
-# Add the vectors as a new column in the DataFrame
-recipes_data['tfidf_vectors'] = recipe_vectors_dense.tolist()
-
 # Save the DataFrame back to CSV
 recipes_data.to_csv('7k-dataset-with-vectors.csv', index=False)
+
+# Save the vectors in binary form (see vector_store.py) instead of as float-list strings in the CSV,
+# stamped with the digest of the CSV they belong to
+save_vectors('7k-dataset-vectors.npz', recipe_vectors, source=file_digest('7k-dataset-with-vectors.csv'))
@@ -1,25 +1,16 @@
-import pandas as pd
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.manifold import TSNE
 import plotly.graph_objects as go
-from tqdm import tqdm
-import concurrent.futures
-import multiprocessing
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from vector_store import load_recipe_vectors, read_recipes
 from joblib import Memory
 
 # Set up caching
 memory = Memory("./cache_dir", verbose=0)
 
-# Function to process TF-IDF vectors
-@memory.cache
-def process_tfidf_vector(vector_str):
-    return np.array(eval(vector_str))
-
-# Function to calculate cosine similarity
-def calculate_similarity(user_vector, recipe_vector):
-    return cosine_similarity(user_vector.reshape(1, -1), recipe_vector.reshape(1, -1))[0][0]
-
 # Cached t-SNE function
 @memory.cache
 def cached_tsne(vectors):
@@ -28,15 +19,14 @@ def cached_tsne(vectors):
 
 # Load the dataset
 print("Loading dataset...")
-df = pd.read_csv("7k-dataset-with-vectors.csv")
+df = read_recipes("7k-dataset-with-vectors.csv")
 
 # Limit to the first 7500 recipes
 df = df.head(7541)
 
-# Convert 'tfidf_vectors' column from string to numpy array using multithreading
-print("Processing TF-IDF vectors...")
-with concurrent.futures.ThreadPoolExecutor(max_workers=multiprocessing.cpu_count()) as executor:
-    df['tfidf_vectors'] = list(tqdm(executor.map(process_tfidf_vector, df['tfidf_vectors']), total=len(df)))
+# Load the TF-IDF vectors from the binary store written by Tf-vector-caching.py
+print("Loading TF-IDF vectors...")
+df['tfidf_vectors'] = list(load_recipe_vectors("7k-dataset-with-vectors.csv", dense=True)[:len(df)])
 
 # Generate user ingredient vector
 user_input_ingredients = ["chicken", "rice", "onion", "red chili", "egg noodles", "rice noodles", "ginger", "tomatoes"]
@@ -62,10 +52,9 @@ all_vectors_3d = cached_tsne(all_vectors)
 user_vector_3d = all_vectors_3d[-1]
 recipes_3d = all_vectors_3d[:-1]
 
-# Step 3: Calculate cosine similarities using multithreading
+# Step 3: Calculate cosine similarities in one vectorized call
 print("Calculating similarities...")
-with concurrent.futures.ThreadPoolExecutor(max_workers=multiprocessing.cpu_count()) as executor:
-    similarities = list(tqdm(executor.map(lambda x: calculate_similarity(user_vector, x), df['tfidf_vectors']), total=len(df)))
+similarities = cosine_similarity(user_vector.reshape(1, -1), np.vstack(df['tfidf_vectors']))[0]
 df['similarity'] = similarities
 
 # Get top 10 similar recipes
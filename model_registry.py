@@ -0,0 +1,59 @@
+import os
+import threading
+import time
+
+
+def dataset_version(path):
+    """Version string for a dataset file, changes whenever the file is rewritten."""
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+class ModelRegistry:
+    """Models fitted once per dataset version and shared by every request.
+
+    ``build(path)`` reads the dataset and returns whatever the handlers need
+    (fitted vectorizers, matrices, filtered variants, lookup tables). The
+    registry keeps the result for the file's current version and only calls
+    ``build`` again when the file changes. The version is checked at most once
+    per ``check_interval`` seconds. A rebuild happens under a lock, so
+    concurrent requests after a change trigger one fit. Until it finishes they
+    keep being served from the previous models.
+    """
+
+    def __init__(self, path, build, check_interval=1.0, clock=time.monotonic):
+        self.path = path
+        self.build = build
+        self.check_interval = check_interval
+        self.clock = clock
+        self.version = None
+        self.models = None
+        self.builds = 0
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Models for the dataset's current version, fitting them if the file changed."""
+        now = self.clock()
+        if self.models is not None and self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return self.models
+        version = dataset_version(self.path)
+        self._checked_at = now
+        if version == self.version:
+            return self.models
+        if self.models is not None and not self._lock.acquire(blocking=False):
+            # Another request is already refitting; keep serving the previous version meanwhile
+            return self.models
+        if self.models is None:
+            self._lock.acquire()
+        try:
+            if version != self.version:
+                self.models = self.build(self.path)
+                self.version = version
+                self.builds += 1
+            return self.models
+        finally:
+            self._lock.release()
+
+    def stats(self):
+        return {'path': self.path, 'version': self.version, 'builds': self.builds}
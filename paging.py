@@ -0,0 +1,49 @@
+# Request paging helpers for recipe-recommendation-api.py, copied from Prod/scoring.py so the
+# root API imports nothing from Prod. tests/test_copies.py checks the two stay identical.
+import numpy as np
+
+
+MAX_PAGE_SIZE = 100
+
+
+def parse_count(value, name):
+    """A non-negative integer request field (ints or digit strings); raises ValueError otherwise."""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"'{name}' must be a non-negative integer")
+    try:
+        count = int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a non-negative integer") from None
+    if count < 0:
+        raise ValueError(f"'{name}' must be a non-negative integer")
+    return count
+
+
+def parse_page(data, default_limit=24, max_limit=MAX_PAGE_SIZE):
+    """(offset, limit) of a request body, with limit capped at max_limit."""
+    offset = parse_count(data.get('offset', 0), 'offset')
+    limit = parse_count(data.get('limit', default_limit), 'limit')
+    return offset, min(limit, max_limit)
+
+
+def top_k(scores, k, offset=0):
+    """Positions of the scores ranked offset..offset+k-1, highest score first.
+
+    Only the top offset + k entries are ever sorted: the cut-off score is found with
+    np.partition and everything above it is ordered with a small lexsort. Ties are
+    broken by position (lower first), so the ranking is deterministic and pages never
+    overlap or skip rows.
+    """
+    scores = np.asarray(scores)
+    end = min(offset + k, len(scores))
+    if end <= offset:
+        return np.empty(0, dtype=np.intp)
+    if end < len(scores):
+        threshold = np.partition(scores, len(scores) - end)[len(scores) - end]
+        above = np.flatnonzero(scores > threshold)
+        tied = np.flatnonzero(scores == threshold)[:end - len(above)]
+        candidates = np.concatenate([above, tied])
+    else:
+        candidates = np.arange(len(scores))
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][offset:end]
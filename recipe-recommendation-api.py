@@ -2,13 +2,56 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
-import heapq
+import os
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
+from model_registry import ModelRegistry
+from paging import parse_page, top_k
+
 app = Flask(__name__)
 CORS(app)
 
+def build_models(path):
+    """Read the recipes and fit one TF-IDF vectorizer per variant (all recipes, vegetarian only)."""
+    recipes_data = pd.read_csv(path)
+
+    # Strip spaces from column names
+    recipes_data.columns = recipes_data.columns.str.strip()
+
+    models = {'recipes_data': recipes_data, 'error': None, 'variants': {}}
+
+    # Check if 'ingredients' column exists
+    if 'ingredients' not in recipes_data.columns:
+        models['error'] = "Error: 'ingredients' column not found in the data."
+        return models
+    if 'veg' not in recipes_data.columns:
+        models['error'] = "Warning: 'veg' column not found in data. Vegetarian filtering not possible."
+        return models
+
+    # Process ingredients column
+    recipes_data["ingredients_list"] = recipes_data["ingredients"].apply(lambda x: x.strip().split(","))
+    recipes_data["ingredients_text"] = recipes_data["ingredients_list"].apply(lambda x: " ".join(x))
+
+    # The vegetarian variant gets its own vectorizer, fitted on the vegetarian recipes only
+    for variant, recipes in (('all', recipes_data), ('veg', recipes_data[recipes_data['veg'] == True])):
+        vectorizer = TfidfVectorizer( ngram_range=(1, 2))
+        models['variants'][variant] = {
+            'recipes': recipes,
+            'records': recipes.to_dict('records'),
+            'vectorizer': vectorizer,
+            'recipe_vectors': vectorizer.fit_transform(recipes["ingredients_text"]),
+        }
+
+    # Recipe page lookup by id; the first recipe with an id wins
+    models['recipe_by_id'] = {}
+    for record in recipes_data.drop(columns=['ingredients_list', 'ingredients_text']).to_dict('records'):
+        models['recipe_by_id'].setdefault(record['id'], record)
+    return models
+
+# Fitted once per version of recipe.csv and refitted only when the file changes
+model_registry = ModelRegistry("recipe.csv", build_models)
+
 def calculate_weighted_similarity(similarity, recipe, user_cuisine, user_course, user_craving):
     """
     Calculates weighted similarity score based on TF-IDF and user preferences.
@@ -52,22 +95,10 @@ def calculate_weighted_similarity(similarity, recipe, user_cuisine, user_course,
 
 @app.route('/api/recommend', methods=['POST'])
 def recommend():
-    # Read recipe data
-    recipes_data = pd.read_csv("recipe.csv")
-
-    # Strip spaces from column names
-    recipes_data.columns = recipes_data.columns.str.strip()
-
-    # Print the cleaned columns to verify
-    #print("Columns:", recipes_data.columns)
-
-    # Check if 'ingredients' column exists
-    if 'ingredients' not in recipes_data.columns:
-        return jsonify("Error: 'ingredients' column not found in the data.")
-
-    # Process ingredients column
-    recipes_data["ingredients_list"] = recipes_data["ingredients"].apply(lambda x: x.strip().split(","))
-    recipes_data["ingredients_text"] = recipes_data["ingredients_list"].apply(lambda x: " ".join(x))
+    # Fitted vectorizers and recipe vectors for the current dataset version
+    models = model_registry.get()
+    if models['error']:
+        return jsonify(models['error'])
 
     # Get user input from request
     data = request.json
@@ -76,38 +107,32 @@ def recommend():
     user_course = data.get('course')
     user_craving = data.get('craving', [])
     user_veg = data.get('veg', False)
+    try:
+        offset, limit = parse_page(data, default_limit=9)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
     user_ingredients_text = " ".join(user_ingredients)
 
-    # Filter vegetarian recipes if the column exists
-    if 'veg' in recipes_data.columns:
-        if user_veg:
-            recipes_data = recipes_data[recipes_data['veg'] == True]
-        print(f"Filtered to {len(recipes_data)} {'vegetarian' if user_veg else 'all'} recipes.")
-    else:
-        return jsonify("Warning: 'veg' column not found in data. Vegetarian filtering not possible.")
-
-    # Create TF-IDF vectorizer
-    vectorizer = TfidfVectorizer( ngram_range=(1, 2))
+    # Use the precomputed vegetarian variant if requested
+    variant = models['variants']['veg' if user_veg else 'all']
+    recipes_data = variant['recipes']
+    print(f"Filtered to {len(recipes_data)} {'vegetarian' if user_veg else 'all'} recipes.")
 
-    # Fit vectorizer and transform recipe ingredients
-    recipe_vectors = vectorizer.fit_transform(recipes_data["ingredients_text"])
-
-    # Transform user input
-    user_vector = vectorizer.transform([user_ingredients_text])
+    # Transform user input with the vectorizer fitted on this variant
+    user_vector = variant['vectorizer'].transform([user_ingredients_text])
 
     # Calculate cosine similarity (TF-IDF)
-    similarities = cosine_similarity(user_vector, recipe_vectors).flatten()
+    similarities = cosine_similarity(user_vector, variant['recipe_vectors']).flatten()
 
     # Calculate weighted similarity for each recipe
     weighted_similarities = [
-        calculate_weighted_similarity(sim, recipes_data.iloc[idx], user_cuisine, user_course, user_craving)
-        for idx, sim in enumerate(similarities)
+        calculate_weighted_similarity(sim, recipe, user_cuisine, user_course, user_craving)
+        for recipe, sim in zip(variant['records'], similarities)
     ]
 
-    # Get top N recommendations
-    top_n = 9
-    top_n_indices = heapq.nlargest(top_n, range(len(weighted_similarities)), weighted_similarities.__getitem__)
+    # Get the requested page of recommendations
+    top_n_indices = top_k(weighted_similarities, limit, offset)
     top_recipes = recipes_data.iloc[top_n_indices]
 
     # Prepare response
@@ -136,11 +161,11 @@ def recipe():
     data = request.json
     id = data.get('id')
     id = int(id)
-    global recipes_data
-    recipes_data = pd.read_csv("recipe.csv")
-    # Strip spaces from column names
-    recipes_data.columns = recipes_data.columns.str.strip()
-    recipe = recipes_data[recipes_data['id'] == id].to_dict('records')[0]
+    recipe_by_id = model_registry.get().get('recipe_by_id', {})
+    if id not in recipe_by_id:
+        return jsonify({"error": "Recipe not found"}), 404
+    # Copy so the stored record is never modified
+    recipe = dict(recipe_by_id[id])
     recipe_data = {
         'image': f"./id-{id}/id-{id}-cover (2).jpeg",
         #'image-2': f"./src/assets/id-{id}/id-{id}-cover (2).jpeg"
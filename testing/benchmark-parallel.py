@@ -7,6 +7,12 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from functools import lru_cache
 import multiprocessing
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Prod'))
+from facet_index import FacetIndex
+from result_cache import ResultCache, canonical_ingredients, canonical_course, dataset_version
 
 app = Flask(__name__)
 CORS(app)
@@ -37,6 +43,10 @@ def load_and_preprocess_data():
 recipes_data = load_and_preprocess_data()
 vectorizer = TfidfVectorizer(binary=True)
 recipe_vectors = vectorizer.fit_transform(recipes_data["ingredients_text"])
+facet_index = FacetIndex(recipes_data)
+
+# Bounded, expiring cache for recommendation results, invalidated when the dataset file changes
+result_cache = ResultCache(maxsize=256, ttl=300)
 
 # Cached preprocessed data
 @lru_cache(maxsize=None)
@@ -87,12 +97,24 @@ def calculate_chunk_similarities(args):
     ]
     return weighted_similarities
 
-# Parallel version of the original recommendation function
-@lru_cache(maxsize=None)
 def get_recommendations_original(user_ingredients, user_cuisine, user_course, user_veg):
+    # Checked on every run so a rewritten dataset between runs never serves the previous results
+    result_cache.set_version(dataset_version('7k-dataset.csv'))
+    # Cuisine is matched exactly, so it stays part of the key as given
+    key = (canonical_ingredients(user_ingredients),
+           tuple(user_cuisine) if isinstance(user_cuisine, list) else user_cuisine,
+           canonical_course(user_course), bool(user_veg))
+    cached, result = result_cache.get(key)
+    if not cached:
+        result = compute_recommendations_original(user_ingredients, user_cuisine, user_course, user_veg)
+        result_cache.put(key, result)
+    return result
+
+# Parallel version of the original recommendation function
+def compute_recommendations_original(user_ingredients, user_cuisine, user_course, user_veg):
     start_time = time.time()
 
-    filtered_recipes = recipes_data[recipes_data['diet'].str.strip().str.lower() == "vegetarian"] if user_veg else recipes_data
+    filtered_recipes = recipes_data[facet_index.equals('diet', 'vegetarian')] if user_veg else recipes_data
 
     if filtered_recipes.empty:
         print("No recipes found for the given filter criteria.")
@@ -150,7 +172,7 @@ def get_recommendations_original(user_ingredients, user_cuisine, user_course, us
 def get_recommendations_brute_force(user_ingredients, user_cuisine, user_course, user_veg):
     start_time = time.time()
     
-    filtered_recipes = recipes_data[recipes_data['diet'].str.strip().str.lower() == "vegetarian"] if user_veg else recipes_data
+    filtered_recipes = recipes_data[facet_index.equals('diet', 'vegetarian')] if user_veg else recipes_data
 
     def calculate_match_score(recipe):
         ingredient_match = len(set(user_ingredients) & set(recipe['ingredients_list']))
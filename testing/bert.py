@@ -29,6 +29,12 @@ ingredients_column = 'ingredients' if 'ingredients' in recipes_data.columns else
 if ingredients_column not in recipes_data.columns:
     raise ValueError(f"Neither 'ingredients' nor 'ingredients_name' column found in the dataset. Available columns are: {recipes_data.columns.tolist()}")
 
+# Normalized name -> row of the first recipe with that name, for /api/recipe
+recipe_row_by_name = {}
+for row, recipe_name in enumerate(recipes_data['name'].str.strip().str.lower()):
+    if isinstance(recipe_name, str):
+        recipe_row_by_name.setdefault(recipe_name, row)
+
 # Extract and join ingredients into text
 recipes_data["ingredients_list"] = recipes_data[ingredients_column].apply(lambda x: str(x).strip().split(","))
 recipes_data["ingredients_text"] = recipes_data["ingredients_list"].apply(lambda x: " ".join(x))
@@ -128,19 +134,14 @@ def recipe():
     if not name:
         return jsonify({"error": "Recipe name is required"}), 400
 
-    # Strip spaces from column names
-    recipes_data.columns = recipes_data.columns.str.strip()
-
-    # Normalize recipe names in the dataset for comparison
-    recipes_data['name'] = recipes_data['name'].str.strip().str.lower()
-
-    # Find the recipe
-    recipe_list = recipes_data[recipes_data['name'] == name].to_dict('records')
+    # Find the recipe without touching the shared DataFrame
+    row = recipe_row_by_name.get(name)
 
-    if not recipe_list:
+    if row is None:
         return jsonify({"error": "Recipe not found"}), 404
 
-    recipe = recipe_list[0]
+    recipe = recipes_data.iloc[[row]].to_dict('records')[0]
+    recipe['name'] = recipe['name'].strip().lower()
 
     # Calculate difficulty and servings
     difficulty = calculate_difficulty(recipe.get('prep_time'), recipe.get('cook_time'))
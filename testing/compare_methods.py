@@ -4,22 +4,28 @@ import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import time
+import os
+import sys
 from recipe_matcher import RecipeMatcher
 import logging
 from tabulate import tabulate
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Prod'))
+from hashing_index import HashingTfidf, text_chunks
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class ProductionMatcher:
-    def __init__(self, dataset_path='7k-dataset.csv'):
+    def __init__(self, dataset_path='7k-dataset.csv', hashing=False):
         # Load dataset
         self.recipes_data = pd.read_csv(dataset_path)
         self.recipes_data.columns = self.recipes_data.columns.str.strip()
         
         # Prepare TF-IDF vectorizer
         self.vectorizer = TfidfVectorizer(binary=True)
+        self.hashing = hashing
         
         # Check for ingredients column
         self.ingredients_column = 'ingredients' if 'ingredients' in self.recipes_data.columns else 'ingredients_name'
@@ -28,8 +34,11 @@ class ProductionMatcher:
         self.recipes_data["ingredients_list"] = self.recipes_data[self.ingredients_column].apply(lambda x: str(x).strip().split(","))
         self.recipes_data["ingredients_text"] = self.recipes_data["ingredients_list"].apply(lambda x: " ".join(x))
         
-        # Fit vectorizer
-        self.recipe_vectors = self.vectorizer.fit_transform(self.recipes_data["ingredients_text"])
+        # Fit vectorizer, or hash the recipes chunk by chunk with a separate idf table
+        if hashing:
+            self.vectorizer, self.recipe_vectors = HashingTfidf.fit_chunks(text_chunks(self.recipes_data["ingredients_text"]))
+        else:
+            self.recipe_vectors = self.vectorizer.fit_transform(self.recipes_data["ingredients_text"])
 
     def recommend(self, user_ingredients, user_cuisine=None, user_course=None, user_veg=False, top_n=24):
         # Transform user input
@@ -49,10 +58,36 @@ class ProductionMatcher:
             self.recipes_data.iloc[idx]['course']
         ) for idx in top_indices]
 
+def ranking_differences(reference, candidate):
+    # Compare two ranked lists of (name, score, cuisine, course)
+    reference_rank = {}
+    for rank, (name, score, _, _) in enumerate(reference):
+        reference_rank.setdefault(name, (rank, score))
+    candidate_rank = {}
+    for rank, (name, score, _, _) in enumerate(candidate):
+        candidate_rank.setdefault(name, (rank, score))
+    common = [name for name in candidate_rank if name in reference_rank]
+
+    first_difference = next((rank for rank, (a, b) in enumerate(zip(reference, candidate)) if a[0] != b[0]), None)
+    return {
+        'common': len(common),
+        'first_difference': first_difference,
+        'mean_displacement': float(np.mean([abs(reference_rank[name][0] - candidate_rank[name][0]) for name in common])) if common else 0.0,
+        'max_score_difference': max((abs(reference_rank[name][1] - candidate_rank[name][1]) for name in common), default=0.0),
+    }
+
+def hashing_collisions(prod_matcher, hashing_matcher):
+    # Vocabulary terms of the fitted vectorizer that share a hash bucket with another term
+    terms = list(prod_matcher.vectorizer.vocabulary_)
+    buckets = pd.Series(hashing_matcher.vectorizer.buckets(terms))
+    return len(terms), buckets.nunique(), int(buckets.duplicated(keep=False).sum())
+
 def create_comparison_output(test_cases):
-    # Initialize both matchers
+    # Initialize the matchers
     matrix_matcher = RecipeMatcher()
     prod_matcher = ProductionMatcher()
+    hashing_matcher = ProductionMatcher(hashing=True)
+    hashing_summary = []
     
     # Open file for writing results with UTF-8 encoding
     with open('comparison_results.txt', 'w', encoding='utf-8') as f:
@@ -121,8 +156,32 @@ def create_comparison_output(test_cases):
             f.write(f"Matrix Unique: {len(matrix_recipes - prod_recipes)}\n")
             f.write(f"Production Unique: {len(prod_recipes - matrix_recipes)}\n")
             
+            # Test Hashing vectorizer against the fitted vocabulary it replaces
+            start_time = time.time()
+            hashing_results = hashing_matcher.recommend(user_ingredients=case['ingredients'])
+            hashing_time = (time.time() - start_time) * 1000
+            differences = ranking_differences(prod_results, hashing_results)
+            hashing_summary.append(differences)
+
+            f.write("\nHashing Vectorizer vs Production:\n")
+            f.write(f"Hashing Method Time: {hashing_time:.2f}ms\n")
+            f.write(f"Common Recipes: {differences['common']} out of 24\n")
+            f.write(f"First Ranking Difference: {'none' if differences['first_difference'] is None else differences['first_difference'] + 1}\n")
+            f.write(f"Mean Rank Displacement: {differences['mean_displacement']:.2f}\n")
+            f.write(f"Max Score Difference: {differences['max_score_difference']:.6f}\n")
+            
             f.write("\n" + "-"*80 + "\n")
 
+        # Hash collisions explain any ranking differences above
+        terms, buckets, colliding = hashing_collisions(prod_matcher, hashing_matcher)
+        f.write(f"\n{'='*80}\n")
+        f.write("Hashing Vectorizer Summary:\n")
+        f.write(f"Features: {hashing_matcher.vectorizer.n_features}\n")
+        f.write(f"Vocabulary Terms: {terms} in {buckets} buckets ({colliding} terms share a bucket)\n")
+        f.write(f"Idf Table: {hashing_matcher.vectorizer.idf_.nbytes / 1024:.0f} KB\n")
+        f.write(f"Identical Rankings: {sum(d['first_difference'] is None for d in hashing_summary)} out of {len(hashing_summary)} test cases\n")
+        f.write(f"Average Common Recipes: {np.mean([d['common'] for d in hashing_summary]):.1f} out of 24\n")
+
 def main():
     # Define test cases
     test_cases = [
@@ -0,0 +1,72 @@
+"""Shared fixtures: a small synthetic recipe dataset and loaders for the API modules.
+
+The API scripts have hyphenated file names and read their configuration from the
+environment at import time, so each test loads a fresh copy after setting up the
+working directory and variables it needs.
+"""
+import importlib.util
+import os
+import random
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROD = os.path.join(ROOT, 'Prod')
+SERVER_API = os.path.join(ROOT, 'Server', 'api')
+
+INGREDIENTS = ['onion', 'tomato', 'garlic', 'ginger', 'paneer', 'rice', 'chicken', 'salt', 'sugar', 'flour',
+               'milk', 'butter', 'coconut', 'tamarind', 'lime', 'chili', 'cumin', 'potato', 'peas', 'egg']
+CUISINES = ['Indian', 'Chinese', 'Thai', 'Italian', 'Mexican']
+COURSES = ['Main Course', 'Side Dish', 'Dessert', 'Snack']
+DIETS = ['Vegetarian', 'Non Vegeterian', 'Eggetarian']
+
+
+def make_recipes(count=80, seed=0):
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        'name': [f"Recipe {i}" for i in range(count)],
+        'image_url': [f"http://img/{i}.jpg" for i in range(count)],
+        'description': [f"Dish number {i}" for i in range(count)],
+        'cuisine': [rng.choice(CUISINES) for _ in range(count)],
+        'course': [rng.choice(COURSES) for _ in range(count)],
+        'diet': [rng.choice(DIETS) for _ in range(count)],
+        'prep_time': [rng.choice([5, 10, 20, 30]) for _ in range(count)],
+        'ingredients_name': [",".join(rng.sample(INGREDIENTS, rng.randint(3, 7))) for _ in range(count)],
+        'cook_time': [rng.choice([10, 25, 45, 90]) for _ in range(count)],
+        'instructions': ["Cook it."] * count,
+    })
+
+
+def load_module(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def dataset_dir(tmp_path, monkeypatch):
+    """Working directory holding 7k-dataset.csv."""
+    make_recipes().to_csv(tmp_path / '7k-dataset.csv', index=False)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def load_prod_api(dataset_dir, monkeypatch):
+    """Load Prod/7k-dataset-api.py over the dataset; with index=True a binary index is built first."""
+    monkeypatch.syspath_prepend(PROD)
+
+    def load(index=False, **env):
+        monkeypatch.setenv('RECIPE_INDEX_DIR', str(dataset_dir / 'index'))
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        if index:
+            from index_artifact import build_index
+            build_index('7k-dataset.csv', str(dataset_dir / 'index'))
+        return load_module(os.path.join(PROD, '7k-dataset-api.py'), 'recipe_api')
+
+    return load
@@ -0,0 +1,93 @@
+"""Modules that are deliberately copied between the apps must not drift apart."""
+import ast
+import filecmp
+import json
+import os
+
+import pytest
+
+from conftest import PROD, ROOT, SERVER_API, load_module
+
+
+def definitions(path, names=None, renames=()):
+    """AST dump of the named (default: all) top-level functions, classes and assignments of a module.
+
+    ``renames`` are (old, new) text replacements applied first, for names a copy legitimately spells differently.
+    """
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    for old, new in renames:
+        source = source.replace(old, new)
+    tree = ast.parse(source)
+    found = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            found[node.name] = ast.dump(node)
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    found[target.id] = ast.dump(node)
+    return {name: found.get(name) for name in (found if names is None else names)}
+
+
+def test_paging_matches_scoring():
+    names = ['MAX_PAGE_SIZE', 'parse_count', 'parse_page', 'top_k']
+    copy = definitions(os.path.join(ROOT, 'paging.py'), names)
+    assert None not in copy.values()
+    assert copy == definitions(os.path.join(PROD, 'scoring.py'), names)
+
+
+# Server copy, original, and (old, new) spellings that differ only because of the copy's file name
+SERVER_COPIES = [
+    ('_facet_index.py', os.path.join(PROD, 'facet_index.py'), []),
+    ('_hashing_index.py', os.path.join(PROD, 'hashing_index.py'), []),
+    ('_startup_timing.py', os.path.join(PROD, 'startup_timing.py'), []),
+    ('_vector_store.py', os.path.join(ROOT, 'vector_store.py'), [('python _vector_store.py', 'python vector_store.py')]),
+]
+
+
+@pytest.mark.parametrize('copy, original, renames', SERVER_COPIES, ids=[copy for copy, _, _ in SERVER_COPIES])
+def test_server_copies_match_originals(copy, original, renames):
+    with open(os.path.join(SERVER_API, copy), encoding='utf-8') as f:
+        header, text = f.read().split('\n', 1)
+    assert header.startswith(f"# Copy of {os.path.relpath(original, ROOT)} ")
+    for old, new in renames:
+        text = text.replace(old, new)
+    with open(original, encoding='utf-8') as f:
+        assert text == f.read()
+
+
+def test_server_index_artifact_matches_prod():
+    copy = definitions(os.path.join(SERVER_API, '_index_artifact.py'), renames=[('_index_artifact', 'index_artifact')])
+    original = definitions(os.path.join(PROD, 'index_artifact.py'), copy)
+    assert None not in original.values()
+    assert copy == original
+
+
+@pytest.fixture
+def artifact_modules(dataset_dir, monkeypatch):
+    monkeypatch.syspath_prepend(PROD)
+    monkeypatch.syspath_prepend(SERVER_API)
+    return (load_module(os.path.join(PROD, 'index_artifact.py'), 'index_artifact'),
+            load_module(os.path.join(SERVER_API, '_index_artifact.py'), '_index_artifact'))
+
+
+@pytest.mark.parametrize('builder', ['build_index', 'build_hashed_index'])
+def test_server_and_prod_build_identical_artifacts(artifact_modules, dataset_dir, builder):
+    prod, server = artifact_modules
+    version = getattr(prod, builder)('7k-dataset.csv', 'prod-index')
+    assert getattr(server, builder)('7k-dataset.csv', 'server-index') == version
+
+    prod_dir, server_dir = dataset_dir / 'prod-index' / version, dataset_dir / 'server-index' / version
+    files = sorted(os.listdir(prod_dir))
+    assert files == sorted(os.listdir(server_dir))
+    manifests = []
+    for directory in (prod_dir, server_dir):
+        with open(directory / 'manifest.json', encoding='utf-8') as f:
+            manifest = json.load(f)
+        manifest.pop('created')
+        manifests.append(manifest)
+    assert manifests[0] == manifests[1]
+    _, mismatch, errors = filecmp.cmpfiles(prod_dir, server_dir, [f for f in files if f != 'manifest.json'],
+                                           shallow=False)
+    assert mismatch == errors == []
@@ -0,0 +1,66 @@
+import pytest
+
+
+@pytest.fixture
+def client(load_prod_api):
+    return load_prod_api().app.test_client()
+
+
+@pytest.mark.parametrize('body', [
+    {'queries': [1]},
+    {'queries': [{'ingredients': ['onion']}, 'onion']},
+    {'queries': {'ingredients': ['onion']}},
+    {'queries': None},
+    [{'ingredients': ['onion']}],
+])
+def test_batch_rejects_non_object_queries(client, body):
+    response = client.post('/api/recommend-ai/batch', json=body)
+    assert response.status_code == 400
+    assert 'queries' in response.get_json()['error']
+
+
+def test_batch_scores_object_queries(client):
+    response = client.post('/api/recommend-ai/batch', json={'queries': [{'ingredients': ['onion'], 'limit': 3}]})
+    assert response.status_code == 200
+    assert len(response.get_json()['results'][0]) == 3
+
+
+@pytest.fixture
+def admin_client(load_prod_api):
+    return load_prod_api(index=True, ADMIN_TOKEN='secret').app.test_client()
+
+
+@pytest.mark.parametrize('body', [
+    {'add': [1]},
+    {'add': [{'ingredients_name': 'onion,rice'}]},
+    {'add': [{'name': 'Pilaf'}]},
+    {'add': [{'name': 'Pilaf', 'ingredients_name': 'onion,rice'}, 'Pilaf']},
+    {'delete': [3]},
+    {'delete': ['Recipe 1', None]},
+])
+def test_admin_update_rejects_malformed_entries(admin_client, body):
+    response = admin_client.post('/api/admin/recipes', json=body, headers={'X-Admin-Token': 'secret'})
+    assert response.status_code == 400
+    assert admin_client.get('/api/snapshot').get_json()['reloading'] is False
+
+
+def test_admin_update_accepts_valid_entries(load_prod_api):
+    api = load_prod_api(index=True, ADMIN_TOKEN='secret')
+    client = api.app.test_client()
+    before = api.snapshots.version
+    body = {'add': [{'name': 'Pilaf', 'ingredients_name': 'onion,rice'}], 'delete': ['Recipe 1']}
+    response = client.post('/api/admin/recipes', json=body, headers={'X-Admin-Token': 'secret'})
+    assert response.status_code == 202
+
+    reload = api.snapshots._reloading
+    if reload is not None:
+        reload.join()
+    assert api.snapshots.last_error is None
+    assert api.snapshots.version != before
+
+
+def test_brute_force_counts_repeated_ingredients(client):
+    single = client.post('/api/recommend-brute-force', json={'ingredients': ['onion', 'rice'], 'limit': 80})
+    repeated = client.post('/api/recommend-brute-force', json={'ingredients': ['onion', 'onion', 'rice'], 'limit': 80})
+    order = [r['id'] for r in single.get_json()['recommendations']]
+    assert order != [r['id'] for r in repeated.get_json()['recommendations']]
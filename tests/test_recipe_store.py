@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import PROD
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.syspath_prepend(PROD)
+    from recipe_store import RecipeStore
+    return RecipeStore(pd.DataFrame({
+        'name': ['a', 'b', 'c'],
+        'cuisine': ['Indian', 'Thai', 'Indian'],
+        'prep_time': ['10', ' 20 ', 'soon'],
+        'cook_time': [15, 40, 5],
+    }))
+
+
+def test_times_are_parsed_once_as_minutes(store):
+    assert store.minutes['prep_time'].dtype == np.float32
+    assert store.total_minutes(0) == 25
+    assert store.total_minutes(1) == 60
+    assert np.isnan(store.total_minutes(2))
+
+
+def test_text_columns_keep_the_original_values(store):
+    assert store.value(1, 'prep_time') == ' 20 '
+    assert store.value(2, 'cuisine') == 'Indian'
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+from conftest import PROD, ROOT, load_module
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    count = 30
+    pd.DataFrame({
+        'id': range(count),
+        'name': [f"Recipe {i}" for i in range(count)],
+        'description': ["A dish"] * count,
+        'ingredients': ["onion,rice" if i % 2 else "paneer,peas" for i in range(count)],
+        'veg': [i % 3 == 0 for i in range(count)],
+        'cuisine': ["Indian"] * count,
+        'course': ["Main Course"] * count,
+        'craving': ["spicy"] * count,
+        'difficulty': ["Easy"] * count,
+        'cooking_time': [20] * count,
+        'serving_size': [2] * count,
+    }).to_csv(tmp_path / 'recipe.csv', index=False)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(ROOT)
+    api = load_module(os.path.join(ROOT, 'recipe-recommendation-api.py'), 'root_recipe_api')
+    return api
+
+
+@pytest.fixture
+def client(api):
+    return api.app.test_client()
+
+
+def test_root_api_does_not_import_from_prod(api):
+    assert PROD not in sys.path
+    assert api.parse_page.__module__ == api.top_k.__module__ == 'paging'
+
+
+def test_recommend_pages_and_validates(client):
+    first = client.post('/api/recommend', json={'ingredients': ['onion'], 'limit': 5}).get_json()
+    second = client.post('/api/recommend', json={'ingredients': ['onion'], 'limit': 5, 'offset': 5}).get_json()
+    assert len(first) == len(second) == 5
+    assert not {r['id'] for r in first} & {r['id'] for r in second}
+    assert client.post('/api/recommend', json={'ingredients': ['onion'], 'limit': -1}).status_code == 400
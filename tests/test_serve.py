@@ -0,0 +1,56 @@
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+from conftest import PROD, load_module
+
+
+@pytest.fixture
+def prod_path(dataset_dir, monkeypatch):
+    monkeypatch.syspath_prepend(PROD)
+    monkeypatch.setenv('RECIPE_INDEX_DIR', str(dataset_dir / 'index'))
+    return dataset_dir
+
+
+@pytest.mark.parametrize('hashing', ['0', '1'])
+def test_load_api_builds_the_configured_index(prod_path, monkeypatch, hashing):
+    monkeypatch.setenv('HASHING_VECTORIZER', hashing)
+    serve = load_module(os.path.join(PROD, 'serve.py'), 'serve')
+    api = serve.load_api('7k-dataset.csv')
+    version = serve.current_version(str(prod_path / 'index'))
+    assert version.endswith('-hashing') == (hashing == '1')
+    assert api.snapshots.version == f"index:{version}"
+
+
+def request(app, method, path, body=b''):
+    """Run one HTTP request through the ASGI app; returns (status, body)."""
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'headers': []}
+    asyncio.run(app(scope, receive, send))
+    return sent[0]['status'], sent[1]['body']
+
+
+def test_passthrough_does_not_use_the_scoring_pool(prod_path, monkeypatch):
+    asgi = load_module(os.path.join(PROD, 'asgi.py'), 'asgi')
+    threads = []
+    call_flask = asgi.call_flask
+
+    def recording_call_flask(environ):
+        threads.append(threading.current_thread().name)
+        return call_flask(environ)
+
+    monkeypatch.setattr(asgi, 'call_flask', recording_call_flask)
+    status, body = request(asgi.app, 'GET', '/api/snapshot')
+    assert status == 200 and 'version' in json.loads(body)
+    assert threads and threads[0].startswith('flask')
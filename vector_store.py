@@ -0,0 +1,116 @@
+"""Binary storage for the TF-IDF recipe vectors.
+
+Tf-vector-caching.py writes the fitted vectors as a compressed sparse (CSR)
+.npz next to the dataset instead of a column of float-list strings, so loading
+is a single binary read instead of parsing every row as a Python literal.
+Datasets produced before that still carry the `tfidf_vectors` column; the first
+load_recipe_vectors() call converts it once, in chunks, and saves the .npz.
+
+The .npz records the SHA-1 of the CSV it belongs to. When the CSV changes, the
+vectors are converted again from its column, or, for a CSV without one, loading
+fails until Tf-vector-caching.py has been rerun.
+
+Usage (one-time conversion of an existing CSV):
+    python vector_store.py convert [--csv 7k-dataset-with-vectors.csv] [--out 7k-dataset-vectors.npz]
+"""
+import argparse
+import hashlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+VECTORS_COLUMN = 'tfidf_vectors'
+DEFAULT_CSV = '7k-dataset-with-vectors.csv'
+DEFAULT_VECTORS = '7k-dataset-vectors.npz'
+
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_vectors(path, recipe_vectors, source=None):
+    """Write the recipe vectors (sparse or dense) as float32 CSR, atomically.
+
+    source is the digest of the CSV the rows belong to (see vectors_source).
+    """
+    matrix = sp.csr_matrix(recipe_vectors, dtype=np.float32)
+    matrix.sort_indices()
+    # The arrays sp.save_npz writes, so sp.load_npz still reads the file, plus the source digest
+    arrays = {'format': b'csr', 'shape': matrix.shape, 'data': matrix.data, 'indices': matrix.indices,
+              'indptr': matrix.indptr}
+    if source is not None:
+        arrays['source'] = source
+    scratch = f"{path}.{os.getpid()}.tmp"
+    with open(scratch, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(scratch, path)
+
+
+def vectors_source(path):
+    """Digest of the CSV the stored vectors were built from, or None if not recorded."""
+    with np.load(path) as arrays:
+        return str(arrays['source']) if 'source' in arrays.files else None
+
+
+def load_vectors(path, dense=False):
+    matrix = sp.load_npz(path).tocsr()
+    return matrix.toarray() if dense else matrix
+
+
+def parse_vector(text):
+    """Parse one '[0.0, 0.1, ...]' cell without going through the Python parser."""
+    return np.fromstring(text.strip().strip('[]'), dtype=np.float32, sep=',')
+
+
+def convert_csv(csv_path=DEFAULT_CSV, vectors_path=DEFAULT_VECTORS, chunksize=500):
+    """Parse the vectors column of an old CSV chunk by chunk and save it as .npz."""
+    if not any(column.strip() == VECTORS_COLUMN for column in pd.read_csv(csv_path, nrows=0).columns):
+        raise ValueError(f"{csv_path} has no '{VECTORS_COLUMN}' column to convert; run Tf-vector-caching.py "
+                         f"to write {os.path.basename(vectors_path)} for it")
+    blocks = []
+    for chunk in pd.read_csv(csv_path, usecols=lambda column: column.strip() == VECTORS_COLUMN,
+                             chunksize=chunksize):
+        blocks.append(sp.csr_matrix(np.vstack([parse_vector(text) for text in chunk.iloc[:, 0]])))
+    recipe_vectors = sp.vstack(blocks, format='csr') if blocks else sp.csr_matrix((0, 0), dtype=np.float32)
+    save_vectors(vectors_path, recipe_vectors, source=file_digest(csv_path))
+    return recipe_vectors
+
+
+def load_recipe_vectors(csv_path=DEFAULT_CSV, vectors_path=None, dense=False):
+    """Recipe vectors from the binary store, converting the CSV's vector column first if needed.
+
+    A store built from a different version of the CSV (or without a recorded one) is not reused.
+    """
+    vectors_path = vectors_path or os.path.join(os.path.dirname(csv_path), DEFAULT_VECTORS)
+    if not os.path.exists(vectors_path) or vectors_source(vectors_path) != file_digest(csv_path):
+        convert_csv(csv_path, vectors_path)
+    return load_vectors(vectors_path, dense)
+
+
+def read_recipes(csv_path=DEFAULT_CSV, **kwargs):
+    """The recipe table without the (large) vectors column."""
+    return pd.read_csv(csv_path, usecols=lambda column: column.strip() != VECTORS_COLUMN, **kwargs)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert the vectors column of a CSV to the binary store")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert = subparsers.add_parser('convert', help="parse the tfidf_vectors column once and write the .npz")
+    convert.add_argument('--csv', default=DEFAULT_CSV)
+    convert.add_argument('--out', default=DEFAULT_VECTORS)
+    args = parser.parse_args()
+
+    start_time = time.time()
+    try:
+        recipe_vectors = convert_csv(args.csv, args.out)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    print(f"Wrote {recipe_vectors.shape[0]} x {recipe_vectors.shape[1]} vectors ({recipe_vectors.nnz} non-zero) "
+          f"to {args.out} in {time.time() - start_time:.2f}s")